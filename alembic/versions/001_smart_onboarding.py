@@ -13,17 +13,35 @@ branch_labels = None
 depends_on = None
 
 
-def _column_exists(table: str, column: str) -> bool:
-    """Check if column exists in table (PostgreSQL)."""
+def _existing_columns(*tables: str) -> set[tuple[str, str]]:
+    """Return (table, column) pairs present in the given tables (PostgreSQL)."""
     conn = op.get_bind()
     result = conn.execute(
         sa.text(
-            "SELECT 1 FROM information_schema.columns "
-            "WHERE table_name = :table AND column_name = :column"
+            "SELECT c.relname, a.attname FROM pg_catalog.pg_attribute a "
+            "JOIN pg_catalog.pg_class c ON c.oid = a.attrelid "
+            "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = ANY(:tables) "
+            "AND a.attnum > 0 AND NOT a.attisdropped "
+            "AND n.nspname = ANY(current_schemas(false))"
         ),
-        {"table": table, "column": column},
+        {"tables": list(tables)},
     )
-    return result.fetchone() is not None
+    return {(table, column) for table, column in result}
+
+
+def _add_columns(table: str, columns: list[tuple[str, sa.types.TypeEngine, str | None]]) -> None:
+    """Add nullable columns with a single ALTER TABLE (one lock, one round-trip)."""
+    if not columns:
+        return
+    dialect = op.get_context().dialect
+    clauses = []
+    for name, col_type, default in columns:
+        clause = f"ADD COLUMN {name} {col_type.compile(dialect=dialect)}"
+        if default is not None:
+            clause += f" DEFAULT {default}"
+        clauses.append(clause)
+    op.execute(sa.text(f"ALTER TABLE {table} " + ", ".join(clauses)))
 
 
 def _table_exists(table: str) -> bool:
@@ -31,8 +49,10 @@ def _table_exists(table: str) -> bool:
     conn = op.get_bind()
     result = conn.execute(
         sa.text(
-            "SELECT 1 FROM information_schema.tables "
-            "WHERE table_name = :table"
+            "SELECT 1 FROM pg_catalog.pg_class c "
+            "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = :table AND c.relkind IN ('r', 'p') "
+            "AND n.nspname = ANY(current_schemas(false))"
         ),
         {"table": table},
     )
@@ -70,6 +90,9 @@ def upgrade() -> None:
             sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
         )
 
+    # Single catalog probe for every column checked below
+    existing = _existing_columns("focuses", "daily_sessions", "users")
+
     # ── 3. Add new columns to focuses ────────────────────────────────────────
     new_focus_columns = [
         ("sphere_id", sa.Integer(), None),
@@ -80,37 +103,31 @@ def upgrade() -> None:
         ("llm_reframe", sa.Text(), None),
         ("is_active", sa.Boolean(), "true"),
         ("week_number", sa.Integer(), None),
+        ("updated_at", sa.DateTime(timezone=True), "now()"),
     ]
-    for col_name, col_type, default in new_focus_columns:
-        if not _column_exists("focuses", col_name):
-            kw = {}
-            if default is not None:
-                kw["server_default"] = default
-            op.add_column("focuses", sa.Column(col_name, col_type, nullable=True, **kw))
-
-    # Add FK constraint for sphere_id if column was just created
-    if _column_exists("focuses", "sphere_id"):
-        try:
-            op.create_foreign_key(
-                "fk_focuses_sphere_id", "focuses", "spheres",
-                ["sphere_id"], ["id"], ondelete="SET NULL",
-            )
-        except Exception:
-            pass  # constraint may already exist
-
-    # Add updated_at to focuses if missing
-    if not _column_exists("focuses", "updated_at"):
-        op.add_column(
-            "focuses",
-            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    _add_columns("focuses", [
+        c for c in new_focus_columns if ("focuses", c[0]) not in existing
+    ])
+
+    # Add FK constraint for sphere_id (the column exists at this point)
+    try:
+        op.create_foreign_key(
+            "fk_focuses_sphere_id", "focuses", "spheres",
+            ["sphere_id"], ["id"], ondelete="SET NULL",
         )
+    except Exception:
+        pass  # constraint may already exist
 
     # ── 4. Add new columns to daily_sessions ─────────────────────────────────
-    if not _column_exists("daily_sessions", "household_tasks"):
-        op.add_column("daily_sessions", sa.Column("household_tasks", sa.JSON, nullable=True))
+    new_session_columns = [
+        ("household_tasks", sa.JSON(), None),
+        ("step_bank_id", sa.Integer(), None),
+    ]
+    _add_columns("daily_sessions", [
+        c for c in new_session_columns if ("daily_sessions", c[0]) not in existing
+    ])
 
-    if not _column_exists("daily_sessions", "step_bank_id"):
-        op.add_column("daily_sessions", sa.Column("step_bank_id", sa.Integer, nullable=True))
+    if ("daily_sessions", "step_bank_id") not in existing:
         try:
             op.create_foreign_key(
                 "fk_daily_sessions_step_bank_id", "daily_sessions", "step_bank",
@@ -120,7 +137,7 @@ def upgrade() -> None:
             pass
 
     # ── 5. Remove old spheres column from users if it exists ─────────────────
-    if _column_exists("users", "spheres"):
+    if ("users", "spheres") in existing:
         op.drop_column("users", "spheres")
 
 
@@ -0,0 +1,54 @@
+"""Composite indexes for today's-session and checkin lookups.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def _check_duplicate_sessions() -> None:
+    """Fail before building the unique index if a user has two sessions on one day.
+
+    The old check-then-insert in _process_dump could race into duplicates.
+    They carry checkins/todos, so they are not merged automatically.
+    """
+    rows = op.get_bind().execute(sa.text(
+        "SELECT user_id, date_local, array_agg(id ORDER BY id) AS ids "
+        "FROM daily_sessions GROUP BY user_id, date_local HAVING count(*) > 1 "
+        "ORDER BY user_id, date_local LIMIT 50"
+    )).all()
+    if rows:
+        listing = "\n".join(
+            f"  user_id={r.user_id} date_local={r.date_local} session ids={list(r.ids)}"
+            for r in rows
+        )
+        raise RuntimeError(
+            "Cannot create unique index ix_daily_sessions_user_date: duplicate "
+            "daily_sessions rows (first 50 shown). Merge each group into one "
+            "session (repoint checkins/todo_items, delete the rest) and rerun:\n"
+            + listing
+        )
+
+
+def upgrade() -> None:
+    _check_duplicate_sessions()
+    op.create_index(
+        "ix_daily_sessions_user_date", "daily_sessions",
+        ["user_id", "date_local"], unique=True, if_not_exists=True,
+    )
+    op.create_index(
+        "ix_checkins_session_kind", "checkins",
+        ["daily_session_id", "kind"], if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_checkins_session_kind", table_name="checkins", if_exists=True)
+    op.drop_index("ix_daily_sessions_user_date", table_name="daily_sessions", if_exists=True)
@@ -0,0 +1,38 @@
+"""Store LLM/analytics payloads as JSONB instead of JSON.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+_COLUMNS = [
+    ("daily_sessions", "llm_response_json"),
+    ("daily_sessions", "household_tasks"),
+    ("events", "metadata_json"),
+]
+
+
+def upgrade() -> None:
+    for table, column in _COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSONB,
+            postgresql_using=f"{column}::jsonb",
+        )
+
+
+def downgrade() -> None:
+    for table, column in _COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.JSON,
+            postgresql_using=f"{column}::json",
+        )
@@ -0,0 +1,85 @@
+"""Range-partition events by month on created_at, BRIN index on created_at.
+
+Existing rows are copied into the new partitioned table: the current month
+gets its own partition, older rows go to the default partition.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-15
+"""
+import datetime as dt
+
+from alembic import op
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def _month_bounds(today: dt.date) -> tuple[dt.date, dt.date]:
+    start = today.replace(day=1)
+    end = (start + dt.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def upgrade() -> None:
+    # Free the old names; the sequence survives the eventual DROP of the old table
+    op.execute("ALTER TABLE events RENAME TO events_old")
+    op.execute("ALTER INDEX events_pkey RENAME TO events_old_pkey")
+    op.execute("ALTER INDEX IF EXISTS ix_events_event_type RENAME TO ix_events_old_event_type")
+    op.execute("ALTER SEQUENCE events_id_seq OWNED BY NONE")
+
+    op.execute(
+        "CREATE TABLE events ("
+        " id INTEGER NOT NULL DEFAULT nextval('events_id_seq'),"
+        " user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,"
+        " event_type VARCHAR(50) NOT NULL,"
+        " metadata_json JSONB,"
+        " created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),"
+        " CONSTRAINT events_pkey PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER SEQUENCE events_id_seq OWNED BY events.id")
+    op.execute("CREATE INDEX ix_events_event_type ON events (event_type)")
+    op.execute("CREATE INDEX ix_events_created_brin ON events USING brin (created_at)")
+
+    # UTC month, matching the partitions the bot pre-creates at runtime
+    start, end = _month_bounds(dt.datetime.now(dt.timezone.utc).date())
+    op.execute(
+        f"CREATE TABLE events_{start:%Y_%m} PARTITION OF events "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+    op.execute("CREATE TABLE events_default PARTITION OF events DEFAULT")
+
+    op.execute(
+        "INSERT INTO events (id, user_id, event_type, metadata_json, created_at) "
+        "SELECT id, user_id, event_type, metadata_json, COALESCE(created_at, now()) "
+        "FROM events_old"
+    )
+    op.execute("DROP TABLE events_old")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE events RENAME TO events_partitioned")
+    op.execute("ALTER INDEX events_pkey RENAME TO events_partitioned_pkey")
+    op.execute("ALTER INDEX ix_events_event_type RENAME TO ix_events_partitioned_event_type")
+    op.execute("DROP INDEX IF EXISTS ix_events_created_brin")
+    op.execute("ALTER SEQUENCE events_id_seq OWNED BY NONE")
+
+    op.execute(
+        "CREATE TABLE events ("
+        " id INTEGER NOT NULL DEFAULT nextval('events_id_seq') PRIMARY KEY,"
+        " user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,"
+        " event_type VARCHAR(50) NOT NULL,"
+        " metadata_json JSONB,"
+        " created_at TIMESTAMP WITH TIME ZONE DEFAULT now()"
+        ")"
+    )
+    op.execute("ALTER SEQUENCE events_id_seq OWNED BY events.id")
+    op.execute("CREATE INDEX ix_events_event_type ON events (event_type)")
+    op.execute(
+        "INSERT INTO events (id, user_id, event_type, metadata_json, created_at) "
+        "SELECT id, user_id, event_type, metadata_json, created_at FROM events_partitioned"
+    )
+    op.execute("DROP TABLE events_partitioned")
@@ -0,0 +1,28 @@
+"""Default created_at to clock_timestamp() on checkins and events.
+
+now() is the transaction start time, so rows written in one transaction
+share a timestamp; clock_timestamp() keeps per-row insertion order.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+_TABLES = ("checkins", "events")
+
+
+def upgrade() -> None:
+    for table in _TABLES:
+        op.alter_column(table, "created_at", server_default=sa.text("clock_timestamp()"))
+
+
+def downgrade() -> None:
+    for table in _TABLES:
+        op.alter_column(table, "created_at", server_default=sa.func.now())
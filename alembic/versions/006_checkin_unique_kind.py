@@ -0,0 +1,28 @@
+"""Unique (daily_session_id, kind) on checkins — target of the checkin upsert.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep the latest checkin of each kind if duplicates slipped in earlier
+    op.execute(
+        "DELETE FROM checkins c USING checkins newer "
+        "WHERE c.daily_session_id = newer.daily_session_id "
+        "AND c.kind = newer.kind AND c.id < newer.id"
+    )
+    op.create_unique_constraint(
+        "uq_checkin_session_kind", "checkins", ["daily_session_id", "kind"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_checkin_session_kind", "checkins", type_="unique")
@@ -0,0 +1,26 @@
+"""Partial index for a session's pending todos.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_todo_user_session_pending", "todo_items",
+        ["user_id", "session_id"],
+        postgresql_where=sa.text("status = 'pending'"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_user_session_pending", table_name="todo_items", if_exists=True)
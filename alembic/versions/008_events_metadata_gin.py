@@ -0,0 +1,25 @@
+"""GIN (jsonb_path_ops) index on events.metadata_json.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_events_metadata", "events", ["metadata_json"],
+        postgresql_using="gin",
+        postgresql_ops={"metadata_json": "jsonb_path_ops"},
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_metadata", table_name="events", if_exists=True)
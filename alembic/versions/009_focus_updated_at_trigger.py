@@ -0,0 +1,29 @@
+"""Maintain focuses.updated_at with a BEFORE UPDATE trigger.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE OR REPLACE FUNCTION trg_set_updated_at() RETURNS trigger AS $$ "
+        "BEGIN NEW.updated_at = now(); RETURN NEW; END $$ LANGUAGE plpgsql"
+    )
+    op.execute("DROP TRIGGER IF EXISTS focuses_set_updated_at ON focuses")
+    op.execute(
+        "CREATE TRIGGER focuses_set_updated_at BEFORE UPDATE ON focuses "
+        "FOR EACH ROW EXECUTE FUNCTION trg_set_updated_at()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS focuses_set_updated_at ON focuses")
+    op.execute("DROP FUNCTION IF EXISTS trg_set_updated_at()")
@@ -0,0 +1,23 @@
+"""Drop ix_checkins_session_kind — uq_checkin_session_kind covers the same columns.
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_checkins_session_kind", table_name="checkins", if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_checkins_session_kind", "checkins",
+        ["daily_session_id", "kind"], if_not_exists=True,
+    )
@@ -0,0 +1,23 @@
+"""Composite index for the todo carry-over lookup.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_todo_user_date_status", "todo_items",
+        ["user_id", "date_local", "status"], if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_user_date_status", table_name="todo_items", if_exists=True)
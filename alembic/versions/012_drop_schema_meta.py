@@ -0,0 +1,21 @@
+"""Drop schema_meta: startup now compares alembic_version against the head revision.
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Only ever created by startup create_all, so it may be absent
+    op.execute("DROP TABLE IF EXISTS schema_meta")
+
+
+def downgrade() -> None:
+    op.execute("CREATE TABLE IF NOT EXISTS schema_meta (id INTEGER PRIMARY KEY, version INTEGER)")
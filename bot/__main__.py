@@ -3,16 +3,31 @@
 import asyncio
 import logging
 import os
+from datetime import timezone
+from pathlib import Path
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 
 from bot.config import settings
 from bot.handlers import get_all_routers
 from bot.middlewares.db import DbSessionMiddleware
-from bot.services.scheduler_service import scheduler, set_bot, rebuild_schedules
+from bot.utils.background import drain
+from bot.services.scheduler_service import (
+    ensure_event_partitions,
+    rebuild_schedules,
+    scheduler,
+    set_bot,
+)
 from bot.db.session import engine
 from bot.db.base import Base
 
@@ -25,26 +40,84 @@ logger = logging.getLogger(__name__)
 # Webhook path uses the bot token as a secret segment
 _WEBHOOK_PATH = f"/webhook/{settings.bot_token}"
 
+# Public base URL for webhook mode: WEBHOOK_BASE_URL, or RENDER_EXTERNAL_URL
+# which Render sets automatically; empty means local polling mode
+_BASE_URL = (settings.webhook_base_url or os.getenv("RENDER_EXTERNAL_URL", "")).rstrip("/")
+_WEBHOOK_URL = f"{_BASE_URL}{_WEBHOOK_PATH}" if _BASE_URL else ""
+_PORT = int(os.getenv("PORT", 8080))
+
+
+_ALEMBIC_DIR = Path(__file__).resolve().parent.parent / "alembic"
+
+
+def _ensure_schema(conn: Connection) -> None:
+    """Bring up the schema on a fresh DB; refuse to start on one behind the Alembic head.
+
+    The schema version is the head migration revision, so it can never lag
+    behind a model change. A fresh database gets create_all and is stamped at
+    head. Anything else must be migrated first: handlers depend on objects
+    only migrations add to existing tables (e.g. the checkin upsert's
+    uq_checkin_session_kind), so starting anyway would fail on every tap.
+    """
+    script = ScriptDirectory(str(_ALEMBIC_DIR))
+    head = script.get_current_head()
+    ctx = MigrationContext.configure(conn)
+    current = ctx.get_current_revision()
+    if current == head:
+        logger.info("Database schema is current (%s)", head)
+        return
+
+    if current is None and not inspect(conn).has_table("users"):
+        Base.metadata.create_all(conn)
+        ctx.stamp(script, head)
+        logger.info("Database tables created at revision %s", head)
+        return
+
+    raise RuntimeError(
+        f"Database schema is at revision {current or 'none (unmanaged)'}, "
+        f"code expects {head}: run `alembic upgrade head` before starting the bot"
+    )
+
 
 async def on_startup(bot: Bot) -> None:
     """Run on bot startup."""
-    # Create tables if they don't exist
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables ensured")
-
-    # Set webhook if running on Render (RENDER_EXTERNAL_URL is set automatically)
-    render_url = os.getenv("RENDER_EXTERNAL_URL", "").rstrip("/")
-    if render_url:
-        webhook_url = f"{render_url}{_WEBHOOK_PATH}"
-        await bot.set_webhook(webhook_url, drop_pending_updates=True)
-        logger.info("Webhook set: %s", webhook_url)
+    # DDL runs on a throwaway connection without a statement cache, so no
+    # pooled connection keeps prepared statements for the altered tables
+    ddl_engine = create_async_engine(
+        settings.database_url,
+        poolclass=NullPool,
+        connect_args={"statement_cache_size": 0},
+    )
+    try:
+        async with ddl_engine.begin() as conn:
+            # Bounded waits: a stuck lock fails the deploy instead of stalling traffic
+            await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            await conn.execute(text("SET LOCAL statement_timeout = '60s'"))
+            await conn.run_sync(_ensure_schema)
+    finally:
+        await ddl_engine.dispose()
+
+    # Register the webhook when a public URL is configured
+    if _BASE_URL:
+        await bot.set_webhook(_WEBHOOK_URL, drop_pending_updates=True)
+        logger.info("Webhook set: %s", _WEBHOOK_URL)
     else:
         # Local dev: make sure no stale webhook is registered
         await bot.delete_webhook(drop_pending_updates=True)
 
     set_bot(bot)
     await rebuild_schedules()
+
+    # Analytics partitions: this month and next now, then on the 1st of every
+    # month. ensure_event_partitions logs its own failures, so a DDL problem
+    # never blocks startup or the user schedules above.
+    await ensure_event_partitions()
+    scheduler.add_job(
+        ensure_event_partitions,
+        trigger=CronTrigger(day=1, hour=0, minute=5, timezone=timezone.utc),
+        id="events_partition",
+        replace_existing=True,
+    )
     scheduler.start()
     logger.info("Scheduler started")
 
@@ -54,24 +127,48 @@ async def on_startup(bot: Bot) -> None:
 
 async def on_shutdown(bot: Bot) -> None:
     """Run on bot shutdown."""
-    render_url = os.getenv("RENDER_EXTERNAL_URL", "")
-    if render_url:
+    if _BASE_URL:
         await bot.delete_webhook()
     scheduler.shutdown(wait=False)
-    await engine.dispose()
+    # Let queued analytics writes finish before their engine goes away
+    await drain(timeout=5)
+    await _dispose_engine()
     logger.info("Bot stopped")
 
 
+async def _dispose_engine() -> None:
+    """Close pooled connections on the loop that owns them; never block shutdown."""
+    try:
+        await asyncio.wait_for(engine.dispose(), timeout=5)
+    except Exception:
+        logger.exception("Failed to dispose DB engine cleanly")
+
+
+def _build_storage() -> BaseStorage:
+    """Redis-backed FSM storage when REDIS_URL is set, in-process memory otherwise."""
+    if settings.redis_url:
+        import orjson
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        # RedisStorage decodes stored values as UTF-8 text before json_loads,
+        # so a binary format (msgpack) cannot be plugged in here; orjson keeps
+        # the wire format and makes every get_data/set_data cheaper.
+        return RedisStorage.from_url(
+            settings.redis_url,
+            json_loads=orjson.loads,
+            json_dumps=lambda data: orjson.dumps(data).decode(),
+        )
+    return MemoryStorage()
+
+
 def _build_dp() -> tuple[Bot, Dispatcher]:
     bot = Bot(
         token=settings.bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
     )
-    dp = Dispatcher(storage=MemoryStorage())
-    dp.message.middleware(DbSessionMiddleware())
-    dp.callback_query.middleware(DbSessionMiddleware())
-    for router in get_all_routers():
-        dp.include_router(router)
+    dp = Dispatcher(storage=_build_storage())
+    dp.update.outer_middleware(DbSessionMiddleware())
+    dp.include_routers(*get_all_routers())
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
     return bot, dp
@@ -80,15 +177,12 @@ def _build_dp() -> tuple[Bot, Dispatcher]:
 async def main() -> None:
     bot, dp = _build_dp()
 
-    render_url = os.getenv("RENDER_EXTERNAL_URL", "")
-
-    if render_url:
-        # ── Production on Render: webhook mode ────────────────────────────────
+    if _BASE_URL:
+        # ── Production: webhook mode ──────────────────────────────────────────
         from aiohttp import web
         from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
-        port = int(os.getenv("PORT", 8080))
-        logger.info("Starting webhook server on port %d (Render mode)...", port)
+        logger.info("Starting webhook server on port %d...", _PORT)
 
         app = web.Application()
         # Health-check endpoint (required for Render web service)
@@ -99,16 +193,29 @@ async def main() -> None:
 
         runner = web.AppRunner(app)
         await runner.setup()
-        site = web.TCPSite(runner, "0.0.0.0", port)
+        site = web.TCPSite(runner, "0.0.0.0", _PORT)
         await site.start()
 
         # Keep alive until process is killed
-        await asyncio.Event().wait()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+            await _dispose_engine()
     else:
         # ── Local dev: polling mode ────────────────────────────────────────────
         logger.info("Starting bot polling (local dev)...")
         await dp.start_polling(bot)
 
 
+def _loop_factory():
+    """uvloop when installed (Linux/macOS), stdlib event loop otherwise."""
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(), loop_factory=_loop_factory())
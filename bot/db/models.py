@@ -2,6 +2,7 @@ import datetime as dt
 from typing import Optional
 
 from sqlalchemy import (
+    DDL,
     BigInteger,
     String,
     Text,
@@ -10,11 +11,14 @@ from sqlalchemy import (
     DateTime,
     Date,
     ForeignKey,
-    JSON,
     Float,
+    Index,
     UniqueConstraint,
+    event,
     func,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from bot.db.base import Base
@@ -40,13 +44,13 @@ class User(Base):
 
     # relationships
     spheres: Mapped[list["Sphere"]] = relationship(
-        back_populates="user", lazy="selectin", cascade="all, delete-orphan"
+        back_populates="user", lazy="raise", cascade="all, delete-orphan"
     )
     focuses: Mapped[list["Focus"]] = relationship(
-        back_populates="user", lazy="selectin", cascade="all, delete-orphan"
+        back_populates="user", lazy="raise", cascade="all, delete-orphan"
     )
     daily_sessions: Mapped[list["DailySession"]] = relationship(
-        back_populates="user", lazy="selectin"
+        back_populates="user", lazy="raise"
     )
 
 
@@ -73,7 +77,7 @@ class Sphere(Base):
 
     user: Mapped["User"] = relationship(back_populates="spheres")
     focuses: Mapped[list["Focus"]] = relationship(
-        back_populates="sphere", lazy="selectin", cascade="all, delete-orphan"
+        back_populates="sphere", lazy="raise", cascade="all, delete-orphan"
     )
 
 
@@ -90,27 +94,51 @@ class Focus(Base):
     )
     period: Mapped[str] = mapped_column(String(10))  # "month" | "week"
     text: Mapped[str] = mapped_column(Text)  # the focus formulation
-    meaning: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # why personally
-    metric: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # how to measure success
-    cost: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # price: time/effort/discomfort
+    # Free-text columns below are deferred: undefer() them where actually read
+    meaning: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)  # why personally
+    metric: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)  # how to measure success
+    cost: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)  # price: time/effort/discomfort
     # LLM goal quality assessment
     llm_score: Mapped[Optional[str]] = mapped_column(
         String(20), nullable=True
     )  # ok / vague / imposed / too_big
-    llm_reframe: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # suggested reformulation
+    llm_reframe: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True, deferred=True
+    )  # suggested reformulation
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     week_number: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 1-4 for weekly
+    # Maintained by the focuses_set_updated_at trigger (see below)
     updated_at: Mapped[dt.datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        DateTime(timezone=True), server_default=func.now()
     )
 
     user: Mapped["User"] = relationship(back_populates="focuses")
     sphere: Mapped[Optional["Sphere"]] = relationship(back_populates="focuses")
     steps: Mapped[list["StepBank"]] = relationship(
-        back_populates="focus", lazy="selectin", cascade="all, delete-orphan"
+        back_populates="focus", lazy="raise", cascade="all, delete-orphan"
     )
 
 
+# BEFORE UPDATE trigger keeps updated_at current without the ORM adding it to
+# every UPDATE; the same DDL ships in migration 009 for existing databases
+event.listen(
+    Focus.__table__,
+    "after_create",
+    DDL(
+        "CREATE OR REPLACE FUNCTION trg_set_updated_at() RETURNS trigger AS $$ "
+        "BEGIN NEW.updated_at = now(); RETURN NEW; END $$ LANGUAGE plpgsql"
+    ),
+)
+event.listen(
+    Focus.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER focuses_set_updated_at BEFORE UPDATE ON focuses "
+        "FOR EACH ROW EXECUTE FUNCTION trg_set_updated_at()"
+    ),
+)
+
+
 # ── Step Bank ──────────────────────────────────────────────────────────────────
 
 class StepBank(Base):
@@ -135,20 +163,25 @@ class StepBank(Base):
 
 class DailySession(Base):
     __tablename__ = "daily_sessions"
+    __table_args__ = (
+        # "today's session for user X" — one session per user per local day
+        Index("ix_daily_sessions_user_date", "user_id", "date_local", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     date_local: Mapped[dt.date] = mapped_column(Date)
-    dump_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Heavy text/JSONB columns are deferred: undefer() them where actually read
+    dump_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)
     is_voice: Mapped[bool] = mapped_column(Boolean, default=False)
     energy: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 1-5
     focus_option: Mapped[Optional[str]] = mapped_column(String(1), nullable=True)
     focus_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    step_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    plan_b_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    step_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)
+    plan_b_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)
     # household minimum tasks from dump
-    household_tasks: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
-    llm_response_json: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    household_tasks: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True, deferred=True)
+    llm_response_json: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True, deferred=True)
     step_bank_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("step_bank.id", ondelete="SET NULL"), nullable=True
     )
@@ -160,9 +193,9 @@ class DailySession(Base):
     )
 
     user: Mapped["User"] = relationship(back_populates="daily_sessions")
-    checkins: Mapped[list["Checkin"]] = relationship(back_populates="session", lazy="selectin")
+    checkins: Mapped[list["Checkin"]] = relationship(back_populates="session", lazy="raise")
     evening_report: Mapped[Optional["EveningReport"]] = relationship(
-        back_populates="session", uselist=False, lazy="selectin"
+        back_populates="session", uselist=False, lazy="raise"
     )
 
 
@@ -170,6 +203,11 @@ class DailySession(Base):
 
 class Checkin(Base):
     __tablename__ = "checkins"
+    __table_args__ = (
+        # One checkin per kind per session — target of the checkin upsert and
+        # the index for (session, kind) lookups
+        UniqueConstraint("daily_session_id", "kind", name="uq_checkin_session_kind"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     daily_session_id: Mapped[int] = mapped_column(
@@ -177,8 +215,9 @@ class Checkin(Base):
     )
     kind: Mapped[str] = mapped_column(String(5))
     status: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
+    # Wall-clock per row (not transaction start) so rows order by insertion
     created_at: Mapped[dt.datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True), server_default=func.clock_timestamp()
     )
 
     session: Mapped["DailySession"] = relationship(back_populates="checkins")
@@ -207,6 +246,16 @@ class EveningReport(Base):
 class TodoItem(Base):
     """Simple task for the day — no coaching, just checkbox tracking."""
     __tablename__ = "todo_items"
+    __table_args__ = (
+        # Pending todos of a session (shown after every checkin); partial, so
+        # done/carried-over rows never bloat it
+        Index(
+            "ix_todo_user_session_pending", "user_id", "session_id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # Carry-over lookup: a user's todos up to today, by status
+        Index("ix_todo_user_date_status", "user_id", "date_local", "status"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
@@ -227,14 +276,63 @@ class TodoItem(Base):
 # ── Analytics Events ───────────────────────────────────────────────────────────
 
 class Event(Base):
+    """Append-only analytics log, range-partitioned by month on created_at.
+
+    The partition key must be part of the primary key, hence (id, created_at).
+    Old months can be dropped with DETACH PARTITION instead of DELETE.
+    """
     __tablename__ = "events"
+    __table_args__ = (
+        # Time-range scans over append-ordered rows: BRIN is tiny vs a btree
+        Index("ix_events_created_brin", "created_at", postgresql_using="brin"),
+        # Containment filters on payload keys (metadata_json @> '{...}')
+        Index(
+            "ix_events_metadata", "metadata_json",
+            postgresql_using="gin",
+            postgresql_ops={"metadata_json": "jsonb_path_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("users.id", ondelete="SET NULL"), nullable=True
     )
     event_type: Mapped[str] = mapped_column(String(50), index=True)
-    metadata_json: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    metadata_json: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[dt.datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True), primary_key=True, server_default=func.clock_timestamp()
+    )
+
+
+# Rows outside any monthly partition land here, so inserts never fail
+event.listen(
+    Event.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT"),
+)
+
+
+def event_partition_ddl(month_start: dt.date) -> str:
+    """CREATE statement for the `events` partition of the month starting at month_start."""
+    end = (month_start + dt.timedelta(days=32)).replace(day=1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS events_{month_start:%Y_%m} PARTITION OF events "
+        f"FOR VALUES FROM ('{month_start}') TO ('{end}')"
     )
+
+
+# Same layout as migration 004: the current (UTC) month gets its own partition
+@event.listens_for(Event.__table__, "after_create")
+def _create_current_event_partition(target, connection, **kw) -> None:
+    this_month = dt.datetime.now(dt.timezone.utc).date().replace(day=1)
+    connection.execute(text(event_partition_ddl(this_month)))
+
+
+# ── Core table handles (hot paths that skip ORM hydration) ─────────────────────
+
+users_t = User.__table__
+sessions_t = DailySession.__table__
+checkins_t = Checkin.__table__
+events_t = Event.__table__
+todo_items_t = TodoItem.__table__
@@ -2,5 +2,23 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from bot.config import settings
 
-engine = create_async_engine(settings.database_url, echo=False)
+engine = create_async_engine(
+    settings.database_url,
+    echo=False,
+    # Bursty per-update queries: keep a modest warm pool, allow short spikes,
+    # and recycle/ping so connections dropped by the server are not handed out
+    pool_size=10,
+    max_overflow=10,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    # Handlers re-run the same parametrised statements on every update:
+    # keep them compiled (SQLAlchemy) and prepared per connection (asyncpg)
+    query_cache_size=1200,
+    # Multi-row INSERTs go out as one VALUES list per 1000 rows
+    insertmanyvalues_page_size=1000,
+    connect_args={
+        "prepared_statement_cache_size": 1024,
+        "statement_cache_size": 1024,
+    },
+)
 async_session = async_sessionmaker(engine, expire_on_commit=False)
@@ -11,16 +11,20 @@ from bot.handlers.settings import router as settings_router
 from bot.handlers.todos import router as todos_router
 
 
-def get_all_routers() -> list[Router]:
-    """Order matters: specific handlers first, catch-all (dump) last."""
-    return [
-        start_router,
-        onboarding_router,
-        focus_router,
-        todos_router,        # todo input state + item callbacks
-        checkin_router,
-        evening_router,
-        deeper_router,
-        settings_router,    # must be before dump (has menu button handlers)
-        dump_router,         # has catch-all voice/text handlers — keep last
-    ]
+# Order matters: specific handlers first, catch-all (dump) last
+_ALL_ROUTERS: tuple[Router, ...] = (
+    start_router,
+    onboarding_router,
+    focus_router,
+    todos_router,        # todo input state + item callbacks
+    checkin_router,
+    evening_router,
+    deeper_router,
+    settings_router,    # must be before dump (has menu button handlers)
+    dump_router,         # has catch-all voice/text handlers — keep last
+)
+
+
+def get_all_routers() -> tuple[Router, ...]:
+    """Routers in registration order (see _ALL_ROUTERS)."""
+    return _ALL_ROUTERS
@@ -2,33 +2,35 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import re
 
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
-from sqlalchemy import select
+from sqlalchemy import insert, literal, select
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.models import User, Checkin, DailySession, TodoItem
+from bot.db.models import User, checkins_t, events_t, sessions_t, todo_items_t
 from bot.keyboards.inline import todo_list_kb
-from bot.utils.analytics import log_event
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
-_STATUS_EMOJI = {
-    "done": "✅",
-    "progress": "🟡",
-    "moved": "⏳",
-    "help": "🆘",
-}
-
-_STATUS_LABEL = {
-    "done": "Сделано",
-    "progress": "В процессе",
-    "moved": "Перенёс",
-    "help": "Нужна помощь",
+# checkin:session_id:kind:status
+_CHECKIN_RE = re.compile(r"checkin:(\d+):(t3|t6):(done|progress|moved|help)")
+
+# status -> (emoji, label, follow-up line appended to the reply)
+_STATUS = {
+    "done": ("✅", "Сделано", "\n\nОтлично! Продолжай в том же духе 💪"),
+    "progress": ("🟡", "В процессе", ""),
+    "moved": ("⏳", "Перенёс", "\n\nОк, бывает. Главное — не забросить совсем."),
+    "help": (
+        "🆘", "Нужна помощь",
+        "\n\nПонял. В Phase 1 здесь будет возможность запросить помощь у команды.",
+    ),
 }
 
 
@@ -38,81 +40,77 @@ async def on_checkin_status(
     db: AsyncSession,
     user_db: User,
 ) -> None:
-    parts = callback.data.split(":")
-    # checkin:session_id:kind:status
-    if len(parts) != 4:
+    m = _CHECKIN_RE.fullmatch(callback.data)
+    if m is None:
         await callback.answer("Ошибка формата", show_alert=True)
         return
-
-    _, session_id_str, kind, status = parts
-    session_id = int(session_id_str)
-
-    # Verify session belongs to user
-    result = await db.execute(
-        select(DailySession).where(
-            DailySession.id == session_id,
-            DailySession.user_id == user_db.id,
-        )
+    session_id, kind, status = int(m[1]), m[2], m[3]
+
+    # Upsert the checkin and log the analytics event in one statement:
+    #   WITH upserted AS (INSERT INTO checkins ... ON CONFLICT ... RETURNING id)
+    #   INSERT INTO events ... SELECT ... FROM upserted RETURNING id
+    # The inner SELECT only yields a row when the session belongs to this
+    # user, so for a foreign/missing session nothing is written at all.
+    # Core tables only: no ORM entities, identity map or autoflush on this path.
+    stmt = pg_insert(checkins_t).from_select(
+        ["daily_session_id", "kind", "status"],
+        select(sessions_t.c.id, literal(kind), literal(status)).where(
+            sessions_t.c.id == session_id,
+            sessions_t.c.user_id == user_db.id,
+        ),
     )
-    session_obj = result.scalar_one_or_none()
-    if not session_obj:
-        await callback.answer("Сессия не найдена", show_alert=True)
-        return
-
-    # Check for existing checkin of same kind
-    existing = await db.execute(
-        select(Checkin).where(
-            Checkin.daily_session_id == session_id,
-            Checkin.kind == kind,
+    upserted = (
+        stmt.on_conflict_do_update(
+            constraint="uq_checkin_session_kind",
+            set_={"status": stmt.excluded.status},
         )
+        .returning(checkins_t.c.id)
+        .cte("upserted")
     )
-    checkin = existing.scalar_one_or_none()
-    if checkin:
-        checkin.status = status
-    else:
-        checkin = Checkin(
-            daily_session_id=session_id,
-            kind=kind,
-            status=status,
+    metadata = {"session_id": session_id, "kind": kind, "status": status}
+    event_id = await db.scalar(
+        insert(events_t)
+        .from_select(
+            ["user_id", "event_type", "metadata_json"],
+            select(
+                literal(user_db.id), literal("checkin_done"), literal(metadata, JSONB),
+            ).select_from(upserted),
         )
-        db.add(checkin)
+        .returning(events_t.c.id)
+    )
+    if event_id is None:
+        await callback.answer("Сессия не найдена", show_alert=True)
+        return
     await db.commit()
 
-    await log_event(db, "checkin_done", user_id=user_db.id, metadata={
-        "session_id": session_id, "kind": kind, "status": status,
-    })
-
-    emoji = _STATUS_EMOJI.get(status, "")
-    label = _STATUS_LABEL.get(status, status)
-
+    emoji, label, follow_up = _STATUS.get(status, ("", status, ""))
     hour_label = "3 часа" if kind == "t3" else "6 часов"
-
-    response = f"{emoji} Чекин ({hour_label}): {label}"
-
-    if status == "done":
-        response += "\n\nОтлично! Продолжай в том же духе 💪"
-    elif status == "help":
-        response += "\n\nПонял. В Phase 1 здесь будет возможность запросить помощь у команды."
-    elif status == "moved":
-        response += "\n\nОк, бывает. Главное — не забросить совсем."
-
-    await callback.message.edit_text(response)
-
-    # Show pending todos if any
-    todos_result = await db.execute(
-        select(TodoItem).where(
-            TodoItem.user_id == user_db.id,
-            TodoItem.session_id == session_id,
-            TodoItem.status == "pending",
-        )
+    response = f"{emoji} Чекин ({hour_label}): {label}{follow_up}"
+
+    # Telegram edit and pending-todos query are independent — overlap them.
+    # return_exceptions: a failed edit ("message is not modified" on a double
+    # tap) must not escape while the query still runs on the request session,
+    # which the middleware would then close underneath it.
+    edit_result, todos_result = await asyncio.gather(
+        callback.message.edit_text(response),
+        db.execute(
+            select(todo_items_t.c.id, todo_items_t.c.text).where(
+                todo_items_t.c.user_id == user_db.id,
+                todo_items_t.c.session_id == session_id,
+                todo_items_t.c.status == "pending",
+            )
+        ),
+        return_exceptions=True,
     )
-    todos = list(todos_result.scalars().all())
+    if isinstance(todos_result, BaseException):
+        raise todos_result
+    if isinstance(edit_result, BaseException):
+        raise edit_result
+    # Plain rows expose .id/.text just like TodoItem, which is all the list needs
+    todos = todos_result.all()
     if todos:
-        lines = ["📋 *Дела на сегодня:*"]
-        for t in todos:
-            lines.append(f"• {t.text}")
         await callback.message.answer(
-            "\n".join(lines),
+            "\n".join(("📋 *Дела на сегодня:*", *(f"• {t.text}" for t in todos))),
             parse_mode="Markdown",
             reply_markup=todo_list_kb(todos),
         )
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import re
 
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
@@ -14,12 +15,15 @@ from bot.db.models import User, DailySession
 from bot.keyboards.inline import main_menu_kb
 from bot.services.coach_engine import coach
 from bot.states.fsm import DeeperStates
-from bot.utils.analytics import log_event
+from bot.utils.analytics import log_event_bg
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+# deeper:session_id
+_DEEPER_RE = re.compile(r"deeper:(\d+)")
+
 
 @router.callback_query(F.data.startswith("deeper:"))
 async def on_go_deeper(
@@ -28,20 +32,26 @@ async def on_go_deeper(
     db: AsyncSession,
     user_db: User,
 ) -> None:
-    session_id = int(callback.data.split(":", 1)[1])
+    m = _DEEPER_RE.fullmatch(callback.data)
+    if m is None:
+        await callback.answer("Ошибка формата", show_alert=True)
+        return
+    session_id = int(m[1])
 
+    # Plain column row: only the two fields the coach needs, no ORM object
     result = await db.execute(
-        select(DailySession).where(
+        select(DailySession.dump_text, DailySession.llm_response_json).where(
             DailySession.id == session_id,
             DailySession.user_id == user_db.id,
         )
     )
-    session_obj = result.scalar_one_or_none()
-    if not session_obj:
+    row = result.one_or_none()
+    if row is None:
         await callback.answer("Сессия не найдена", show_alert=True)
         return
+    dump_text, llm_response = row
 
-    await log_event(db, "go_deeper_started", user_id=user_db.id, metadata={
+    log_event_bg("go_deeper_started", user_id=user_db.id, metadata={
         "session_id": session_id,
     })
 
@@ -49,8 +59,8 @@ async def on_go_deeper(
 
     try:
         response = await coach.go_deeper(
-            dump_text=session_obj.dump_text or "",
-            emotion_mirror=session_obj.llm_response_json.get("emotion_mirror", "") if session_obj.llm_response_json else "",
+            dump_text=dump_text or "",
+            emotion_mirror=llm_response.get("emotion_mirror", "") if llm_response else "",
             tone=user_db.tone,
         )
     except Exception as e:
@@ -81,7 +91,7 @@ async def on_deeper_response(
     text = message.text.strip().lower()
 
     if text in ("готово", "done", "хватит", "стоп"):
-        await log_event(db, "go_deeper_completed", user_id=user_db.id)
+        log_event_bg("go_deeper_completed", user_id=user_db.id)
         await message.answer(
             "🙏 Спасибо за честность с собой. "
             "Это важный шаг. Возвращайся к фокусу дня!",
@@ -2,19 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-import tempfile
 from datetime import date, datetime
-from pathlib import Path
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot, Router, F
+from aiogram.filters import Filter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
-from sqlalchemy import select
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.db.models import User, Focus, DailySession
+from bot.db.models import User, Sphere, Focus, DailySession
 from bot.keyboards.inline import (
     focus_options_kb,
     energy_kb,
@@ -22,61 +24,115 @@ from bot.keyboards.inline import (
     main_menu_kb,
     voice_confirm_kb,
 )
-from bot.services.coach_engine import coach, DumpAnalysis
+from bot.services.coach_cache import analyze_mind_dump_cached
+from bot.services.coach_engine import DumpAnalysis
 from bot.services.transcriber import transcriber
 from bot.states.fsm import DumpStates, FocusStates
-from bot.utils.analytics import log_event
+from bot.utils.analytics import log_event_bg
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+# Menu button texts that must NOT be treated as a direct dump
+_MENU_TEXTS = frozenset({
+    "🧠 Dump", "🎯 Фокус дня", "📅 Фокус недели", "🗓 Фокус месяца", "⚙️ Настройки"
+})
+
 
 # ── Helpers ────────────────────────────────────────────────────────────────────
 
+@lru_cache(maxsize=512)
+def _zi(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
 async def _get_focuses(db: AsyncSession, user_id: int) -> tuple[str, str]:
+    """(weekly, monthly) active focus texts, comma-joined by Postgres."""
     result = await db.execute(
-        select(Focus).where(Focus.user_id == user_id, Focus.is_active.is_(True))
+        select(
+            Focus.period,
+            func.string_agg(Focus.text, aggregate_order_by(literal(", "), Focus.id)),
+        )
+        .where(Focus.user_id == user_id, Focus.is_active.is_(True))
+        .group_by(Focus.period)
     )
-    all_focuses = result.scalars().all()
-    weekly = ", ".join(f.text for f in all_focuses if f.period == "week")
-    monthly = ", ".join(f.text for f in all_focuses if f.period == "month")
-    return weekly, monthly
+    by_period = dict(result.all())
+    return by_period.get("week", ""), by_period.get("month", "")
 
 
-def _format_analysis(a: DumpAnalysis) -> str:
-    lines = []
-    if a.emotion_mirror:
-        lines.append(f"🪞 *Зеркало эмоций*\n{a.emotion_mirror}")
-    if a.need_meaning:
-        lines.append(f"💡 *Потребность*\n{a.need_meaning}")
-    if a.tasks:
-        tasks_text = "\n".join(f"  • {t}" for t in a.tasks)
-        lines.append(f"📋 *Задачи*\n{tasks_text}")
-    if a.focus_mapping:
-        lines.append(f"🎯 *Связь с фокусом*\n{a.focus_mapping}")
-
-    if a.option_a:
-        lines.append(
-            f"🅰️ *Вариант A: {a.option_a.focus_text}*\n"
-            f"  Шаг (30-45 мин): {a.option_a.step_text}\n"
-            f"  План Б (10 мин): {a.option_a.plan_b_text}"
-        )
-    if a.option_b:
-        lines.append(
-            f"🅱️ *Вариант B: {a.option_b.focus_text}*\n"
-            f"  Шаг (30-45 мин): {a.option_b.step_text}\n"
-            f"  План Б (10 мин): {a.option_b.plan_b_text}"
-        )
+async def _get_sphere_names(db: AsyncSession, user_id: int) -> list[str]:
+    result = await db.scalars(
+        select(Sphere.name).where(Sphere.user_id == user_id).order_by(Sphere.id)
+    )
+    return list(result)
+
+
+async def _get_dump_context(db: AsyncSession, user_id: int) -> tuple[str, str, str]:
+    """(weekly, monthly, spheres) strings for the dump prompt.
 
-    lines.append(f"⚡ *Энергия*: {a.suggested_energy}/5")
+    Both reads share `db`, so they run back to back, never concurrently.
+    """
+    weekly, monthly = await _get_focuses(db, user_id)
+    spheres = ", ".join(await _get_sphere_names(db, user_id))
+    return weekly, monthly, spheres
 
-    return "\n\n".join(lines)
+
+# Analysis message sections; empty ones are dropped, the rest joined by blank lines
+_MIRROR_TPL = "🪞 *Зеркало эмоций*\n{}"
+_NEED_TPL = "💡 *Потребность*\n{}"
+_TASKS_TPL = "📋 *Задачи*\n{}"
+_MAPPING_TPL = "🎯 *Связь с фокусом*\n{}"
+_OPTION_TPL = (
+    "{icon} *Вариант {o.label}: {o.focus_text}*\n"
+    "  Шаг (30-45 мин): {o.step_text}\n"
+    "  План Б (10 мин): {o.plan_b_text}"
+)
+_ENERGY_TPL = "⚡ *Энергия*: {}/5"
+
+
+def _format_analysis(a: DumpAnalysis) -> str:
+    tasks = "\n".join(f"  • {t}" for t in a.tasks)
+    sections = (
+        a.emotion_mirror and _MIRROR_TPL.format(a.emotion_mirror),
+        a.need_meaning and _NEED_TPL.format(a.need_meaning),
+        tasks and _TASKS_TPL.format(tasks),
+        a.focus_mapping and _MAPPING_TPL.format(a.focus_mapping),
+        a.option_a and _OPTION_TPL.format(icon="🅰️", o=a.option_a),
+        a.option_b and _OPTION_TPL.format(icon="🅱️", o=a.option_b),
+        _ENERGY_TPL.format(a.suggested_energy),
+    )
+    return "\n\n".join(s for s in sections if s)
 
 
 def _user_today(user: User) -> date:
-    tz = ZoneInfo(user.tz_personal or "Europe/Moscow")
-    return datetime.now(tz).date()
+    """User's local date — only call once a handler knows it needs it."""
+    return datetime.now(_zi(user.tz_personal or "Europe/Moscow")).date()
+
+
+async def _get_today_session(db: AsyncSession, user: User) -> DailySession | None:
+    """Today's session (accepted or not) — the single lookup behind every dump check."""
+    result = await db.execute(
+        select(DailySession).where(
+            DailySession.user_id == user.id,
+            DailySession.date_local == _user_today(user),
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def _has_accepted_session(db: AsyncSession, user: User) -> bool:
+    """Existence probe for today's accepted session — one int, no ORM row."""
+    result = await db.execute(
+        select(DailySession.id)
+        .where(
+            DailySession.user_id == user.id,
+            DailySession.date_local == _user_today(user),
+            DailySession.accepted_at.is_not(None),
+        )
+        .limit(1)
+    )
+    return result.scalar() is not None
 
 
 # ── Entry points (button or command or direct message) ─────────────────────────
@@ -98,20 +154,31 @@ async def focus_day_button(
     message: Message, db: AsyncSession, user_db: User
 ) -> None:
     today = _user_today(user_db)
+    # Plain column row: no ORM identity, no JSON payload over the wire
     result = await db.execute(
-        select(DailySession).where(
+        select(
+            DailySession.focus_text,
+            DailySession.step_text,
+            DailySession.plan_b_text,
+            DailySession.energy,
+        )
+        .where(
             DailySession.user_id == user_db.id,
             DailySession.date_local == today,
         )
+        .limit(1)
     )
-    session = result.scalar_one_or_none()
+    session = result.first()
     if session and session.focus_text:
+        # User-supplied text: sent unparsed so stray * or _ cannot break it
         await message.answer(
-            f"🎯 *Фокус дня*: {session.focus_text}\n"
-            f"📌 Шаг: {session.step_text or '—'}\n"
-            f"🔄 План Б: {session.plan_b_text or '—'}\n"
-            f"⚡ Энергия: {session.energy or '—'}/5",
-            parse_mode="Markdown",
+            "\n".join((
+                f"🎯 Фокус дня: {session.focus_text}",
+                f"📌 Шаг: {session.step_text or '—'}",
+                f"🔄 План Б: {session.plan_b_text or '—'}",
+                f"⚡ Энергия: {session.energy or '—'}/5",
+            )),
+            parse_mode=None,
         )
     else:
         await message.answer(
@@ -131,51 +198,50 @@ async def on_dump_yes(
         await callback.answer("Сначала пройди настройку: /start", show_alert=True)
         return
 
-    await callback.message.edit_text(
-        "Отправь голосовое сообщение или напиши текст — "
-        "выгрузи всё, что в голове прямо сейчас. 🧠"
-    )
     await state.set_state(DumpStates.waiting_dump)
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.edit_text(
+            "Отправь голосовое сообщение или напиши текст — "
+            "выгрузи всё, что в голове прямо сейчас. 🧠"
+        ),
+        callback.answer(),
+    )
 
 
 @router.callback_query(F.data == "dump_later")
 async def on_dump_later(
     callback: CallbackQuery,
 ) -> None:
-    await callback.message.edit_text(
-        "Ок, напомню позже. Когда будешь готов(а) — "
-        "нажми 🧠 Dump или просто отправь голосовое."
+    await asyncio.gather(
+        callback.message.edit_text(
+            "Ок, напомню позже. Когда будешь готов(а) — "
+            "нажми 🧠 Dump или просто отправь голосовое."
+        ),
+        callback.answer(),
     )
-    await callback.answer()
 
 
 # ── Voice message handler ─────────────────────────────────────────────────────
 
 @router.message(DumpStates.waiting_dump, F.voice)
-async def on_voice_dump(
-    message: Message,
-    bot: Bot,
-    state: FSMContext,
-    db: AsyncSession,
-    user_db: User,
-) -> None:
+async def on_voice_dump(message: Message, bot: Bot, state: FSMContext) -> None:
+    await _handle_voice_dump(message, bot, state)
+
+
+async def _handle_voice_dump(message: Message, bot: Bot, state: FSMContext) -> None:
+    """Transcribe a voice dump and ask for confirmation (shared by both entry points)."""
     status_msg = await message.answer("🎙 Транскрибирую голосовое...")
 
-    # Download voice file
+    # Download voice file into memory — no temp file round-trip
     file = await bot.get_file(message.voice.file_id)
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-        tmp_path = tmp.name
-    await bot.download_file(file.file_path, tmp_path)
+    buf = await bot.download_file(file.file_path)
 
     try:
-        text = await transcriber.transcribe(tmp_path)
+        text = await transcriber.transcribe_bytes(buf.getvalue())
     except Exception as e:
         logger.error("Transcription failed: %s", e)
         await status_msg.edit_text("Не удалось распознать голосовое. Попробуй ещё раз или напиши текстом.")
         return
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
 
     if not text.strip():
         await status_msg.edit_text("Не удалось распознать речь. Попробуй ещё раз.")
@@ -198,17 +264,18 @@ async def confirm_voice_dump(
     if not text:
         await callback.answer("Текст не найден", show_alert=True)
         return
-    await callback.answer()  # must answer before LLM call in _process_dump
-    await callback.message.delete()
-    await _process_dump(callback.message, state, db, user_db, text, is_voice=True)
+    # must answer before LLM call in _process_dump
+    await asyncio.gather(callback.answer(), callback.message.delete())
+    today_session = await _get_today_session(db, user_db)
+    await _process_dump(callback.message, state, db, user_db, text, True, today_session)
 
 
 @router.callback_query(DumpStates.waiting_dump, F.data == "vc_edit:dump")
 async def edit_voice_dump(callback: CallbackQuery) -> None:
-    await callback.message.edit_text(
-        "✏️ Напиши текстом — что хочешь разобрать:"
+    await asyncio.gather(
+        callback.message.edit_text("✏️ Напиши текстом — что хочешь разобрать:"),
+        callback.answer(),
     )
-    await callback.answer()
 
 
 # ── Text message handler ──────────────────────────────────────────────────────
@@ -225,7 +292,8 @@ async def on_text_dump(
         await message.answer("Напиши побольше — хотя бы пару предложений, чтобы было что анализировать.")
         return
 
-    await _process_dump(message, state, db, user_db, text, is_voice=False)
+    today_session = await _get_today_session(db, user_db)
+    await _process_dump(message, state, db, user_db, text, False, today_session)
 
 
 # ── Also handle voice/text outside FSM state (direct send) ────────────────────
@@ -242,59 +310,48 @@ async def on_voice_direct(
         await message.answer("Сначала пройди настройку: /start")
         return
 
-    # Check if there's already a session today
-    today = _user_today(user_db)
-    result = await db.execute(
-        select(DailySession).where(
-            DailySession.user_id == user_db.id,
-            DailySession.date_local == today,
-            DailySession.accepted_at.isnot(None),
-        )
-    )
-    if result.scalar_one_or_none():
+    # Check if there's already an accepted session today
+    if await _has_accepted_session(db, user_db):
         await message.answer("У тебя уже есть фокус на сегодня! Используй 🎯 Фокус дня чтобы посмотреть.")
         return
 
     await state.set_state(DumpStates.waiting_dump)
-    await on_voice_dump(message, bot, state, db, user_db)
+    await _handle_voice_dump(message, bot, state)
 
 
 # ── Direct text message outside FSM (user just sends text in private chat) ────
 
-@router.message(F.text & ~F.text.startswith("/"))
+class DumpEligible(Filter):
+    """Let through only texts that can be a dump — no DB access, no handler call."""
+
+    async def __call__(self, message: Message, user_db: User) -> bool | dict[str, str]:
+        # Cheapest test first: short chat messages are never a dump
+        if len(message.text) < 10:
+            return False
+        text = message.text.strip()
+        if len(text) < 10 or text in _MENU_TEXTS:
+            return False  # too short, or a menu button handled by other routers
+        if not user_db.onboarding_complete:
+            return False  # silently ignore — onboarding handlers will pick up
+        return {"dump_text": text}
+
+
+@router.message(F.text & ~F.text.startswith("/"), DumpEligible())
 async def on_text_direct(
     message: Message,
     state: FSMContext,
     db: AsyncSession,
     user_db: User,
+    dump_text: str,
 ) -> None:
-    # Skip menu button texts
-    menu_texts = {"🧠 Dump", "🎯 Фокус дня", "📅 Фокус недели", "🗓 Фокус месяца", "⚙️ Настройки"}
-    if message.text.strip() in menu_texts:
-        return  # handled by other routers
-
-    if not user_db.onboarding_complete:
-        return  # silently ignore — onboarding handlers will pick up
-
     # Check if there's already an accepted session today
-    today = _user_today(user_db)
-    result = await db.execute(
-        select(DailySession).where(
-            DailySession.user_id == user_db.id,
-            DailySession.date_local == today,
-            DailySession.accepted_at.isnot(None),
-        )
-    )
-    if result.scalar_one_or_none():
+    today_session = await _get_today_session(db, user_db)
+    if today_session is not None and today_session.accepted_at is not None:
         # User has a focus today; don't treat random text as dump
         return
 
-    text = message.text.strip()
-    if len(text) < 10:
-        return  # too short, probably not a dump
-
     await state.set_state(DumpStates.waiting_dump)
-    await on_text_dump(message, state, db, user_db)
+    await _process_dump(message, state, db, user_db, dump_text, False, today_session)
 
 
 # ── Core processing ───────────────────────────────────────────────────────────
@@ -306,44 +363,41 @@ async def _process_dump(
     user_db: User,
     text: str,
     is_voice: bool,
+    today_session: DailySession | None,
 ) -> None:
-    today = _user_today(user_db)
-
+    """`today_session` is the caller's _get_today_session() result — no re-query here."""
     # Dedup: если уже есть подтверждённый фокус сегодня — не создаём новую сессию
-    existing_result = await db.execute(
-        select(DailySession).where(
-            DailySession.user_id == user_db.id,
-            DailySession.date_local == today,
-            DailySession.accepted_at.isnot(None),
-        )
-    )
-    if existing_result.scalar_one_or_none():
+    if today_session is not None and today_session.accepted_at is not None:
         await message.answer(
             "У тебя уже есть фокус на сегодня! Нажми 🎯 Фокус дня чтобы посмотреть."
         )
         await state.clear()
         return
 
-    await message.answer("🤔 Анализирую...")
-
-    weekly_focus, monthly_focus = await _get_focuses(db, user_db.id)
+    # The status message and the prompt-context reads are independent.
+    # return_exceptions: a failed send must not escape while the reads still
+    # run on the request session (the middleware would close it under them).
+    sent, context = await asyncio.gather(
+        message.answer("🤔 Анализирую..."),
+        _get_dump_context(db, user_db.id),
+        return_exceptions=True,
+    )
+    if isinstance(context, BaseException):
+        raise context
+    if isinstance(sent, BaseException):
+        raise sent
+    weekly_focus, monthly_focus, spheres = context
 
-    analysis = await coach.analyze_mind_dump(
+    analysis = await analyze_mind_dump_cached(
         text=text,
         weekly_focus=weekly_focus,
         monthly_focus=monthly_focus,
         tone=user_db.tone,
-        spheres=", ".join(s.name for s in user_db.spheres) if user_db.spheres else "",
+        spheres=spheres,
     )
 
     # Reuse незавершённую сессию за сегодня (если была — пользователь начал dump и вышел)
-    existing2 = await db.execute(
-        select(DailySession).where(
-            DailySession.user_id == user_db.id,
-            DailySession.date_local == today,
-        )
-    )
-    session_obj = existing2.scalar_one_or_none()
+    session_obj = today_session
 
     if session_obj:
         session_obj.dump_text = text
@@ -353,7 +407,7 @@ async def _process_dump(
     else:
         session_obj = DailySession(
             user_id=user_db.id,
-            date_local=today,
+            date_local=_user_today(user_db),
             dump_text=text,
             is_voice=is_voice,
             energy=analysis.suggested_energy,
@@ -366,11 +420,13 @@ async def _process_dump(
         session_obj.focus_text = analysis.option_a.focus_text
         session_obj.step_text = analysis.option_a.step_text
         session_obj.plan_b_text = analysis.option_a.plan_b_text
+    # flush assigns the id (INSERT ... RETURNING); no refresh SELECT needed
+    await db.flush()
+    session_id = session_obj.id
     await db.commit()
-    await db.refresh(session_obj)
 
-    await log_event(db, "dump_created", user_id=user_db.id, metadata={
-        "is_voice": is_voice, "session_id": session_obj.id
+    log_event_bg("dump_created", user_id=user_db.id, metadata={
+        "is_voice": is_voice, "session_id": session_id
     })
 
     # Send analysis
@@ -383,23 +439,12 @@ async def _process_dump(
         reply_markup=focus_options_kb(),
     )
 
-    # Store analysis in FSM for focus selection
+    # Store analysis in FSM for focus selection — the raw payload once; option
+    # fields are read from it (dump text / mirror are persisted on the session)
     await state.update_data(
-        session_id=session_obj.id,
+        session_id=session_id,
         analysis_raw=analysis.raw,
-        option_a={
-            "focus": analysis.option_a.focus_text if analysis.option_a else "",
-            "step": analysis.option_a.step_text if analysis.option_a else "",
-            "plan_b": analysis.option_a.plan_b_text if analysis.option_a else "",
-        },
-        option_b={
-            "focus": analysis.option_b.focus_text if analysis.option_b else "",
-            "step": analysis.option_b.step_text if analysis.option_b else "",
-            "plan_b": analysis.option_b.plan_b_text if analysis.option_b else "",
-        },
         suggested_energy=analysis.suggested_energy,
         go_deeper_triggered=analysis.go_deeper_triggered,
-        dump_text=text,
-        emotion_mirror=analysis.emotion_mirror,
     )
     await state.set_state(FocusStates.choosing_option)
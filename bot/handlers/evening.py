@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 
 from aiogram import Bot, Router, F
@@ -12,8 +13,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import User, DailySession, EveningReport
 from bot.keyboards.inline import main_menu_kb, voice_confirm_kb
+from bot.services.transcriber import transcriber
 from bot.states.fsm import EveningStates
-from bot.utils.analytics import log_event
+from bot.utils.analytics import log_event_bg
 
 logger = logging.getLogger(__name__)
 
@@ -37,15 +39,9 @@ async def on_evening_status(
     _, session_id_str, status = parts
     session_id = int(session_id_str)
 
-    # Verify
-    result = await db.execute(
-        select(DailySession).where(
-            DailySession.id == session_id,
-            DailySession.user_id == user_db.id,
-        )
-    )
-    session_obj = result.scalar_one_or_none()
-    if not session_obj:
+    # Verify (primary-key get, ownership checked on the loaded row)
+    session_obj = await db.get(DailySession, session_id)
+    if session_obj is None or session_obj.user_id != user_db.id:
         await callback.answer("Сессия не найдена", show_alert=True)
         return
 
@@ -57,14 +53,16 @@ async def on_evening_status(
     )
     await state.set_state(EveningStates.waiting_text)
 
-    await callback.message.edit_text(
-        f"Статус дня: {status_emoji}\n\n"
-        "Напиши или скажи голосом:\n"
-        "1. Что сделал?\n"
-        "2. Что помогло или помешало?\n"
-        "3. Первый шаг завтра?"
+    await asyncio.gather(
+        callback.message.edit_text(
+            f"Статус дня: {status_emoji}\n\n"
+            "Напиши или скажи голосом:\n"
+            "1. Что сделал?\n"
+            "2. Что помогло или помешало?\n"
+            "3. Первый шаг завтра?"
+        ),
+        callback.answer(),
     )
-    await callback.answer()
 
 
 # ── Evening text ───────────────────────────────────────────────────────────────
@@ -98,7 +96,7 @@ async def on_evening_text(
         db.add(report)
     await db.commit()
 
-    await log_event(db, "evening_report_done", user_id=user_db.id, metadata={
+    log_event_bg("evening_report_done", user_id=user_db.id, metadata={
         "session_id": session_id, "status": status,
     })
 
@@ -121,23 +119,16 @@ async def on_evening_voice(
     db: AsyncSession,
     user_db: User,
 ) -> None:
-    from bot.services.transcriber import transcriber
-    import tempfile
-    from pathlib import Path
-
+    # Download into memory — no temp file round-trip
     file = await bot.get_file(message.voice.file_id)
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-        tmp_path = tmp.name
-    await bot.download_file(file.file_path, tmp_path)
+    buf = await bot.download_file(file.file_path)
 
     try:
-        text = await transcriber.transcribe(tmp_path)
+        text = await transcriber.transcribe_bytes(buf.getvalue())
     except Exception as e:
         logger.error("Evening voice transcription failed: %s", e)
         await message.answer("Не удалось распознать. Напиши текстом.")
         return
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
 
     if not text.strip():
         await message.answer("Не удалось распознать речь. Напиши текстом.")
@@ -160,8 +151,7 @@ async def confirm_voice_evening(
     if not text:
         await callback.answer("Текст не найден", show_alert=True)
         return
-    await callback.answer()
-    await callback.message.delete()
+    await asyncio.gather(callback.answer(), callback.message.delete())
     # Reuse text handler
     callback.message.text = text
     await on_evening_text(callback.message, state, db, user_db)
@@ -169,10 +159,12 @@ async def confirm_voice_evening(
 
 @router.callback_query(EveningStates.waiting_text, F.data == "vc_edit:evening")
 async def edit_voice_evening(callback: CallbackQuery) -> None:
-    await callback.message.edit_text(
-        "✏️ Напиши исправленный вариант:\n"
-        "1. Что сделал?\n"
-        "2. Что помогло или помешало?\n"
-        "3. Первый шаг завтра?"
+    await asyncio.gather(
+        callback.message.edit_text(
+            "✏️ Напиши исправленный вариант:\n"
+            "1. Что сделал?\n"
+            "2. Что помогло или помешало?\n"
+            "3. Первый шаг завтра?"
+        ),
+        callback.answer(),
     )
-    await callback.answer()
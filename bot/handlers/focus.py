@@ -2,27 +2,35 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import datetime
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
-from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
-from bot.db.models import User, DailySession
+from bot.db.models import User, DailySession, TodoItem
 from bot.keyboards.inline import energy_kb, go_deeper_kb, main_menu_kb, todo_input_kb
 from bot.services.scheduler_service import schedule_checkins, schedule_evening_reminders
 from bot.states.fsm import FocusStates
-from bot.utils.analytics import log_event
+from bot.utils.analytics import log_event_bg
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
 
+@lru_cache(maxsize=512)
+def _zi(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
 # ── Focus option A / B ─────────────────────────────────────────────────────────
 
 @router.callback_query(FocusStates.choosing_option, F.data.startswith("focus:"))
@@ -36,34 +44,42 @@ async def on_focus_chosen(
     data = await state.get_data()
     session_id = data["session_id"]
 
-    opt_data = data.get(f"option_{option.lower()}", {})
+    # Options live only in the raw LLM payload: {"focus", "step", "plan_b"}
+    opt_data = data.get("analysis_raw", {}).get(f"option_{option.lower()}") or {}
 
-    result = await db.execute(
-        select(DailySession).where(DailySession.id == session_id)
-    )
-    session_obj = result.scalar_one_or_none()
-    if not session_obj:
+    # Primary-key get: served from the identity map when already loaded
+    session_obj = await db.get(DailySession, session_id)
+    if session_obj is None:
         await callback.answer("Сессия не найдена", show_alert=True)
         return
 
+    focus_text = opt_data.get("focus", "")
+    step_text = opt_data.get("step", "")
+    plan_b_text = opt_data.get("plan_b", "")
+
     session_obj.focus_option = option
-    session_obj.focus_text = opt_data.get("focus", "")
-    session_obj.step_text = opt_data.get("step", "")
-    session_obj.plan_b_text = opt_data.get("plan_b", "")
+    # _process_dump already stored option A as the default — only B needs the texts
+    if option != "A" or session_obj.focus_text != focus_text:
+        session_obj.focus_text = focus_text
+        session_obj.step_text = step_text
+        session_obj.plan_b_text = plan_b_text
     await db.commit()
 
     suggested_energy = data.get("suggested_energy", 3)
 
-    await callback.message.edit_text(
-        f"✅ Выбран вариант {option}!\n\n"
-        f"🎯 {session_obj.focus_text}\n"
-        f"📌 Шаг: {session_obj.step_text}\n"
-        f"🔄 План Б: {session_obj.plan_b_text}\n\n"
-        f"Подтверди уровень энергии (предлагаю {suggested_energy}/5):",
-        reply_markup=energy_kb(suggested_energy),
-    )
     await state.set_state(FocusStates.confirming_energy)
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.edit_text(
+            f"✅ Выбран вариант {option}!\n\n"
+            f"🎯 {focus_text}\n"
+            f"📌 Шаг: {step_text}\n"
+            f"🔄 План Б: {plan_b_text}\n\n"
+            f"Подтверди уровень энергии (предлагаю {suggested_energy}/5):",
+            parse_mode=None,
+            reply_markup=energy_kb(suggested_energy),
+        ),
+        callback.answer(),
+    )
 
 
 # ── Energy confirmation ────────────────────────────────────────────────────────
@@ -79,22 +95,21 @@ async def on_energy_confirmed(
     data = await state.get_data()
     session_id = data["session_id"]
 
-    result = await db.execute(
-        select(DailySession).where(DailySession.id == session_id)
+    session_obj = await db.get(
+        DailySession, session_id, options=[undefer(DailySession.step_text)]
     )
-    session_obj = result.scalar_one_or_none()
-    if not session_obj:
+    if session_obj is None:
         await callback.answer("Сессия не найдена", show_alert=True)
         return
 
-    tz = ZoneInfo(user_db.tz_personal or "Europe/Moscow")
+    tz = _zi(user_db.tz_personal or "Europe/Moscow")
     now = datetime.now(tz)
 
     session_obj.energy = energy
     session_obj.accepted_at = now
     await db.commit()
 
-    await log_event(db, "focus_selected", user_id=user_db.id, metadata={
+    log_event_bg("focus_selected", user_id=user_db.id, metadata={
         "session_id": session_id,
         "option": session_obj.focus_option,
         "energy": energy,
@@ -126,50 +141,44 @@ async def on_energy_confirmed(
     go_deeper = data.get("go_deeper_triggered", False)
 
     if go_deeper:
-        await callback.message.edit_text(
+        edit = callback.message.edit_text(
             response_text + "\n\n"
             "💭 Я заметил в твоём дампе сигналы тревоги или перегрузки. "
             "Если хочешь — можем разобраться глубже.",
+            parse_mode=None,
             reply_markup=go_deeper_kb(session_id),
         )
     else:
-        await callback.message.edit_text(response_text)
+        edit = callback.message.edit_text(response_text, parse_mode=None)
+    await asyncio.gather(edit, callback.answer())
 
     # Ask for simple daily tasks (checklist)
     await _ask_for_todos(callback, state, db, user_db, session_id)
-    await callback.answer()
 
 
 async def _ask_for_todos(callback, state, db, user_db, session_id: int) -> None:
     """After focus confirmed — ask if there are simple todos to track."""
-    from sqlalchemy import select
-    from datetime import date, datetime
-    from zoneinfo import ZoneInfo
-    from bot.db.models import TodoItem
-
-    # Find carried-over todos from previous days
-    tz = ZoneInfo(user_db.tz_personal or "Europe/Moscow")
+    # Attach carried-over todos from previous days to today's session in one write
+    tz = _zi(user_db.tz_personal or "Europe/Moscow")
     today = datetime.now(tz).date()
     carried = await db.execute(
-        select(TodoItem).where(
+        update(TodoItem)
+        .where(
             TodoItem.user_id == user_db.id,
             TodoItem.date_local <= today,
             TodoItem.status == "pending",
             TodoItem.session_id.is_(None),  # not yet attached to a session
         )
+        .values(session_id=session_id, date_local=today)
+        .returning(TodoItem.text)
     )
-    carried_items = list(carried.scalars().all())
-
-    # Attach carried-over todos to today's session
-    for item in carried_items:
-        item.session_id = session_id
-        item.date_local = today
-    if carried_items:
+    carried_names = carried.scalars().all()
+    if carried_names:
         await db.commit()
 
     carried_text = ""
-    if carried_items:
-        names = "\n".join(f"• {t.text}" for t in carried_items)
+    if carried_names:
+        names = "\n".join(f"• {name}" for name in carried_names)
         carried_text = f"\n\nС вчера перенесено:\n{names}"
 
     await state.set_state(FocusStates.entering_todos)
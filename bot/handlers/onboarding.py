@@ -2,18 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
+import bisect
+import heapq
 import logging
-import tempfile
-from pathlib import Path
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Coroutine
 
 from aiogram import Bot, Router, F
+from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
-from sqlalchemy import select
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
+from sqlalchemy import bindparam, insert, literal, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import User, Sphere, Focus, StepBank
 from bot.keyboards.inline import (
+    PRESET_SPHERES,
     spheres_kb,
     rating_scale_kb,
     priority_confirm_kb,
@@ -25,98 +35,155 @@ from bot.keyboards.inline import (
     main_menu_kb,
     voice_confirm_kb,
 )
-from bot.services.llm_client import llm_client
+from bot.services.coach_cache import chat_json_cached
 from bot.services.transcriber import transcriber
 from bot.prompts.validate_goal import build_validate_goal_prompt, build_validate_goal_user_message
 from bot.prompts.decompose import build_decompose_prompt, build_decompose_user_message
 from bot.states.fsm import OnboardingStates
-from bot.utils.analytics import log_event
+from bot.utils.analytics import log_event_bg
+from bot.utils.background import spawn
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Statements built once at import; per call only the parameters change
+_ACTIVE_MONTHLY_FOCUSES = select(Focus.id, Focus.text).where(
+    Focus.user_id == bindparam("uid"),
+    Focus.period == "month",
+    Focus.is_active.is_(True),
+)
+
 # Menu button texts that must NOT be treated as onboarding input
 _MENU_TEXTS = frozenset({
     "🧠 Dump", "🎯 Фокус дня", "📅 Фокус недели", "🗓 Фокус месяца", "⚙️ Настройки"
 })
 
+# Goal validation verdicts (llm score -> emoji / headline)
+_SCORE_EMOJI = {"ok": "✅", "vague": "🌫", "imposed": "🚩", "too_big": "📏"}
+_SCORE_LABEL = {
+    "ok": "Отличная цель!",
+    "vague": "Расплывчато — давай конкретнее",
+    "imposed": "Похоже на навязанную цель",
+    "too_big": "Слишком много за 30 дней",
+}
+
+# Goal answers that are not worth an LLM round-trip: too short to judge or a
+# canned non-answer. They get a local "vague" verdict instead.
+_MIN_GOAL_LEN = 10
+_NON_GOAL_RE = re.compile(
+    r"(не знаю|незнаю|хз|не уверен[а]?|хочу вс[её]|вс[её]|ничего|без понятия)[.!?…\s]*",
+    re.IGNORECASE,
+)
+_VAGUE_GOAL_VERDICT = {
+    "score": "vague",
+    "analysis": "Слишком коротко, чтобы понять, чего ты хочешь. "
+                "Опиши результат, который хочешь увидеть через месяц, и зачем он тебе.",
+    "reframe": "",
+}
+
+# Monthly goal prompts, rendered with str.format per priority sphere
+_MONTH_GOAL_ASK_TPL = (
+    "🗓 *Месячный фокус: {sphere}*\n\n"
+    "Расскажи про цель на этот месяц — чего хочешь достичь и зачем?\n\n"
+    "Пиши свободно, голосом или текстом. Одного-двух предложений хватит."
+)
+_MONTH_GOAL_REWRITE_TPL = (
+    "🗓 *{sphere}*\n\n"
+    "Расскажи заново — чего хочешь достичь и зачем?\n"
+    "Голосом или текстом, свободно."
+)
+_MONTH_GOAL_VERDICT_TPL = "🗓 *{sphere}*\n\nЦель: _{goal}_\n\n{emoji} *{label}*"
+
 
 async def _transcribe_voice(message: Message, bot: Bot) -> str | None:
     """Скачать и транскрибировать голосовое. Возвращает None при ошибке."""
     file = await bot.get_file(message.voice.file_id)
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-        tmp_path = tmp.name
-    await bot.download_file(file.file_path, tmp_path)
+    buf = await bot.download_file(file.file_path)
     try:
-        text = await transcriber.transcribe(tmp_path)
+        text = await transcriber.transcribe_bytes(buf.getvalue())
         return text.strip() or None
     except Exception as e:
         logger.error("Transcription failed in onboarding: %s", e)
         return None
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # STEP 1: SPHERES SELECTION
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def _selected_spheres(data: dict) -> tuple[int, tuple[str, ...]]:
+    """Sphere selection from the FSM draft: preset bitmask + sorted custom names."""
+    return data.get("sphere_mask", 0), tuple(data.get("custom_spheres", ()))
+
+
+def _sphere_names(data: dict) -> list[str]:
+    """Selected sphere names in assessment order, resolved from the FSM draft."""
+    mask, custom = _selected_spheres(data)
+    return [s for i, s in enumerate(PRESET_SPHERES) if mask >> i & 1] + list(custom)
+
+
+def _priority_sphere(data: dict, pos: int) -> tuple[str, int]:
+    """(name, sphere id) of the pos-th priority sphere."""
+    idx = data["priority_idx"][pos]
+    return _sphere_names(data)[idx], data["sphere_ids"][idx]
+
+
 @router.callback_query(OnboardingStates.choosing_spheres, F.data.startswith("sphere:"))
 async def on_sphere_toggle(callback: CallbackQuery, state: FSMContext) -> None:
-    from bot.keyboards.inline import PRESET_SPHERES
-
+    await callback.answer()
     raw = callback.data.split(":", 1)[1]
     data = await state.get_data()
-    selected: set = set(data.get("selected_spheres", []))
+    mask, custom = _selected_spheres(data)
 
-    # Resolve index to sphere name
     if raw.startswith("c"):
-        # Custom sphere — find by index among custom items
-        custom = sorted(s for s in selected if s not in PRESET_SPHERES)
+        # Custom spheres are always selected — tapping one removes it
         idx = int(raw[1:])
-        sphere = custom[idx] if idx < len(custom) else None
+        if idx >= len(custom):
+            return
+        custom = custom[:idx] + custom[idx + 1:]
     else:
         idx = int(raw)
-        sphere = PRESET_SPHERES[idx] if idx < len(PRESET_SPHERES) else None
-
-    if sphere is None:
-        await callback.answer()
-        return
+        if idx >= len(PRESET_SPHERES):
+            return
+        mask ^= 1 << idx
 
-    if sphere in selected:
-        selected.discard(sphere)
-    else:
-        selected.add(sphere)
-
-    await state.update_data(selected_spheres=list(selected))
-    await callback.message.edit_reply_markup(reply_markup=spheres_kb(selected))
-    await callback.answer()
+    # One read + one write per tap (update_data would read the storage again)
+    data.update(sphere_mask=mask, custom_spheres=list(custom))
+    await state.set_data(data)
+    await callback.message.edit_reply_markup(reply_markup=spheres_kb(mask, custom))
 
 
 @router.callback_query(OnboardingStates.choosing_spheres, F.data == "sphere_custom")
 async def on_sphere_custom(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
     await callback.message.edit_text(
         "✏️ Напечатай название своей сферы на клавиатуре:\n\n"
         "(например: Путешествия, Спорт, Бизнес)"
     )
     await state.set_state(OnboardingStates.entering_custom_sphere)
-    await callback.answer()
 
 
 @router.message(OnboardingStates.entering_custom_sphere, F.text)
 async def on_custom_sphere_text(message: Message, state: FSMContext) -> None:
-    if message.text.strip() in _MENU_TEXTS:
+    text = message.text.strip()
+    if not text or text in _MENU_TEXTS:
         await message.answer("✏️ Напечатай название своей сферы:")
         return
-    custom = message.text.strip()[:50]
+    custom_name = text[:50]
     data = await state.get_data()
-    selected: set = set(data.get("selected_spheres", []))
-    selected.add(f"✨ {custom}")
-    await state.update_data(selected_spheres=list(selected))
+    mask, custom = _selected_spheres(data)
+
+    # custom_spheres is kept sorted: bisect finds the slot, duplicates are no-ops
+    name = f"✨ {custom_name}"
+    i = bisect.bisect_left(custom, name)
+    if i == len(custom) or custom[i] != name:
+        custom = custom[:i] + (name,) + custom[i:]
+        data["custom_spheres"] = list(custom)
+        await state.set_data(data)
 
     await message.answer(
-        f"Добавлена: ✨ {custom}\n\nВыбери ещё сферы или нажми «Готово»:",
-        reply_markup=spheres_kb(selected),
+        f"Добавлена: ✨ {custom_name}\n\nВыбери ещё сферы или нажми «Готово»:",
+        reply_markup=spheres_kb(mask, custom),
     )
     await state.set_state(OnboardingStates.choosing_spheres)
 
@@ -125,33 +192,34 @@ async def on_custom_sphere_text(message: Message, state: FSMContext) -> None:
 async def on_spheres_done(
     callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
 ) -> None:
-    data = await state.get_data()
-    selected = list(data.get("selected_spheres", []))
-
+    selected = _sphere_names(await state.get_data())
     if len(selected) < 3:
         await callback.answer("Выбери минимум 3 сферы", show_alert=True)
         return
+    await callback.answer()
 
-    # Save spheres to DB
-    for name in selected:
-        existing = await db.execute(
-            select(Sphere).where(Sphere.user_id == user_db.id, Sphere.name == name)
-        )
-        if not existing.scalar_one_or_none():
-            db.add(Sphere(
-                user_id=user_db.id,
-                name=name,
-                is_custom=name.startswith("✨"),
-            ))
+    # Save spheres to DB in one INSERT. Rows kept from a reselect conflict;
+    # the no-op DO UPDATE makes RETURNING report their ids too, so later
+    # steps address spheres by primary key.
+    stmt = pg_insert(Sphere).values([
+        {"user_id": user_db.id, "name": name, "is_custom": name.startswith("✨")}
+        for name in selected
+    ])
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            constraint="uq_user_sphere", set_={"name": stmt.excluded.name},
+        ).returning(Sphere.name, Sphere.id)
+    )
+    ids = dict(result.all())
     await db.commit()
 
-    # Start assessment loop
+    # Start assessment loop. FSM keeps ids parallel to _sphere_names(); names
+    # themselves are never duplicated into the draft.
     await state.update_data(
-        sphere_list=selected,
+        sphere_ids=[ids[name] for name in selected],
         current_sphere_idx=0,
     )
     await _ask_satisfaction(callback.message, state, selected[0])
-    await callback.answer()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -170,14 +238,15 @@ async def _ask_satisfaction(message, state: FSMContext, sphere_name: str) -> Non
 
 @router.callback_query(OnboardingStates.rating_satisfaction, F.data.startswith("satisfaction:"))
 async def on_satisfaction(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
     score = int(callback.data.split(":")[1])
     data = await state.get_data()
     idx = data["current_sphere_idx"]
-    sphere_name = data["sphere_list"][idx]
+    sphere_name = _sphere_names(data)[idx]
 
-    assessments = data.get("assessments", {})
-    assessments.setdefault(sphere_name, {})["satisfaction"] = score
-    await state.update_data(assessments=assessments)
+    # Flat per-sphere keys: a tap writes one scalar, not a nested dict
+    data[f"sat_{idx}"] = score
+    await state.set_data(data)
 
     await callback.message.edit_text(
         f"📊 *{sphere_name}*\n"
@@ -187,21 +256,20 @@ async def on_satisfaction(callback: CallbackQuery, state: FSMContext) -> None:
         reply_markup=rating_scale_kb("importance"),
     )
     await state.set_state(OnboardingStates.rating_importance)
-    await callback.answer()
 
 
 @router.callback_query(OnboardingStates.rating_importance, F.data.startswith("importance:"))
 async def on_importance(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
     score = int(callback.data.split(":")[1])
     data = await state.get_data()
     idx = data["current_sphere_idx"]
-    sphere_name = data["sphere_list"][idx]
+    sphere_name = _sphere_names(data)[idx]
 
-    assessments = data.get("assessments", {})
-    assessments[sphere_name]["importance"] = score
-    await state.update_data(assessments=assessments)
+    data[f"imp_{idx}"] = score
+    await state.set_data(data)
 
-    sat = assessments[sphere_name]["satisfaction"]
+    sat = data[f"sat_{idx}"]
     await callback.message.edit_text(
         f"📊 *{sphere_name}*\n"
         f"Удовлетворённость: {sat}/10 | Важность изменений: {score}/10\n\n"
@@ -209,7 +277,6 @@ async def on_importance(callback: CallbackQuery, state: FSMContext) -> None:
         parse_mode="Markdown",
     )
     await state.set_state(OnboardingStates.entering_pain)
-    await callback.answer()
 
 
 async def _handle_pain(
@@ -217,25 +284,23 @@ async def _handle_pain(
 ) -> None:
     data = await state.get_data()
     idx = data["current_sphere_idx"]
-    sphere_name = data["sphere_list"][idx]
-
-    assessments = data.get("assessments", {})
-    assessments[sphere_name]["pain"] = pain
-    await state.update_data(assessments=assessments)
-
-    # Save to DB
-    result = await db.execute(
-        select(Sphere).where(Sphere.user_id == user_db.id, Sphere.name == sphere_name)
+    sphere_list = _sphere_names(data)
+    sphere_name = sphere_list[idx]
+
+    # Save to DB by primary key (pain is not needed later in the flow)
+    await db.execute(
+        update(Sphere)
+        .where(Sphere.id == data["sphere_ids"][idx])
+        .values(
+            satisfaction=data[f"sat_{idx}"],
+            importance=data[f"imp_{idx}"],
+            pain_text=pain,
+        )
+        .execution_options(synchronize_session=False)
     )
-    sphere_obj = result.scalar_one_or_none()
-    if sphere_obj:
-        sphere_obj.satisfaction = assessments[sphere_name]["satisfaction"]
-        sphere_obj.importance = assessments[sphere_name]["importance"]
-        sphere_obj.pain_text = pain
-        await db.commit()
+    await db.commit()
 
     # Move to next sphere or finish assessment
-    sphere_list = data["sphere_list"]
     next_idx = idx + 1
 
     if next_idx < len(sphere_list):
@@ -249,17 +314,18 @@ async def _handle_pain(
         )
         await state.set_state(OnboardingStates.rating_satisfaction)
     else:
-        await _show_priorities(message, state, assessments)
+        await _show_priorities(message, state, data)
 
 
 @router.message(OnboardingStates.entering_pain, F.text)
 async def on_pain_text(
     message: Message, state: FSMContext, db: AsyncSession, user_db: User,
 ) -> None:
-    if message.text.strip() in _MENU_TEXTS:
+    text = message.text.strip()
+    if not text or text in _MENU_TEXTS:
         await message.answer("Ты в процессе настройки. Напиши одну фразу: что сейчас болит или чего хочется в этой сфере?")
         return
-    await _handle_pain(message, state, db, user_db, message.text.strip())
+    await _handle_pain(message, state, db, user_db, text)
 
 
 @router.message(OnboardingStates.entering_pain, F.voice)
@@ -294,29 +360,27 @@ async def confirm_voice_pain(
 
 @router.callback_query(OnboardingStates.entering_pain, F.data == "vc_edit:pain")
 async def edit_voice_pain(callback: CallbackQuery) -> None:
-    await callback.message.edit_text("✏️ Напиши, что сейчас болит или чего хочется:")
     await callback.answer()
+    await callback.message.edit_text("✏️ Напиши, что сейчас болит или чего хочется:")
 
 
-async def _show_priorities(message: Message, state: FSMContext, assessments: dict) -> None:
+async def _show_priorities(message: Message, state: FSMContext, data: dict) -> None:
     # Priority score = importance * (11 - satisfaction) — higher = more priority
-    scored = []
-    for name, data in assessments.items():
-        imp = data.get("importance", 5)
-        sat = data.get("satisfaction", 5)
-        priority_score = imp * (11 - sat)
-        scored.append((name, priority_score, imp, sat))
-
-    scored.sort(key=lambda x: x[1], reverse=True)
-    top = scored[:3]
+    ratings = (
+        (idx, name, data.get(f"imp_{idx}", 5), data.get(f"sat_{idx}", 5))
+        for idx, name in enumerate(_sphere_names(data))
+    )
+    scored = ((idx, name, imp * (11 - sat), imp, sat) for idx, name, imp, sat in ratings)
+    # Same order (ties included) as sorted(..., reverse=True)[:3]
+    top = heapq.nlargest(3, scored, key=lambda x: x[2])
 
     priorities_text = "\n".join(
         f"  {i+1}. {name} (удовл. {sat}/10, важность {imp}/10)"
-        for i, (name, _, imp, sat) in enumerate(top)
+        for i, (_, name, _, imp, sat) in enumerate(top)
     )
 
-    priority_names = [name for name, _, _, _ in top]
-    await state.update_data(priority_spheres=priority_names)
+    priority_names = [name for _, name, _, _, _ in top]
+    await state.update_data(priority_idx=[idx for idx, *_ in top])
 
     await message.answer(
         "🎯 *Карта реальности готова!*\n\n"
@@ -332,112 +396,147 @@ async def _show_priorities(message: Message, state: FSMContext, assessments: dic
 async def on_priorities_confirmed(
     callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
 ) -> None:
+    await callback.answer()
     data = await state.get_data()
-    priority_names = data["priority_spheres"]
 
     # Mark priorities in DB
-    for name in priority_names:
-        result = await db.execute(
-            select(Sphere).where(Sphere.user_id == user_db.id, Sphere.name == name)
-        )
-        sphere_obj = result.scalar_one_or_none()
-        if sphere_obj:
-            sphere_obj.is_priority = True
+    await db.execute(
+        update(Sphere)
+        .where(Sphere.id.in_([data["sphere_ids"][i] for i in data["priority_idx"]]))
+        .values(is_priority=True)
+        .execution_options(synchronize_session=False)
+    )
     await db.commit()
 
     # Start monthly focus loop for first priority
-    await state.update_data(
-        current_priority_idx=0,
-        monthly_focuses={},
-    )
-    sphere_name = priority_names[0]
+    await state.update_data(current_priority_idx=0)
+    sphere_name, _ = _priority_sphere(data, 0)
     await callback.message.edit_text(
-        f"🗓 *Месячный фокус: {sphere_name}*\n\n"
-        "Расскажи про цель на этот месяц — чего хочешь достичь и зачем?\n\n"
-        "Пиши свободно, голосом или текстом. Одного-двух предложений хватит.",
+        _MONTH_GOAL_ASK_TPL.format(sphere=sphere_name),
         parse_mode="Markdown",
     )
     await state.set_state(OnboardingStates.entering_month_result)
-    await callback.answer()
 
 
 @router.callback_query(OnboardingStates.confirming_priorities, F.data == "priorities_reselect")
 async def on_priorities_reselect(callback: CallbackQuery, state: FSMContext) -> None:
-    data = await state.get_data()
-    selected = set(data.get("selected_spheres", []))
+    await callback.answer()
     await callback.message.edit_text(
         "Выбери сферы заново:",
-        reply_markup=spheres_kb(selected),
+        reply_markup=spheres_kb(*_selected_spheres(await state.get_data())),
     )
     await state.set_state(OnboardingStates.choosing_spheres)
-    await callback.answer()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # STEP 3: MONTHLY FOCUS (loop per priority sphere) — один свободный вопрос
 # ═══════════════════════════════════════════════════════════════════════════════
 
-async def _handle_month_goal(message: Message, state: FSMContext, raw_text: str) -> None:
-    """Общая логика обработки свободного описания цели (текст или голос)."""
-    data = await state.get_data()
-    idx = data["current_priority_idx"]
-    sphere_name = data["priority_spheres"][idx]
-    mf = data.get("monthly_focuses", {})
-    mf.setdefault(sphere_name, {})["raw_text"] = raw_text
-    await state.update_data(monthly_focuses=mf)
-
-    await message.answer("🤔 Оцениваю формулировку цели...")
+# Decompositions started while the user is still reading the goal verdict.
+# FSM storage cannot hold tasks, so they live here keyed by the FSM key;
+# each entry remembers the goal text it was started for. This is a per-process
+# best effort: with several workers the accept tap may land on another one,
+# which simply decomposes again. Capped so abandoned onboardings can't pile up.
+_MAX_SPECULATIVE_DECOMPS = 256
+_speculative_decomps: OrderedDict[StorageKey, tuple[str, asyncio.Task[dict]]] = OrderedDict()
 
-    sys_prompt = build_validate_goal_prompt(data.get("tone", "neutral"))
-    user_msg = build_validate_goal_user_message(sphere=sphere_name, goal_text=raw_text)
 
+async def _decompose(
+    tone: str, sphere_name: str, focus_text: str, raw_text: str, *, refresh: bool = False,
+) -> dict:
     try:
-        llm_result = await llm_client.chat_json(
-            system_prompt=sys_prompt,
-            user_message=user_msg,
+        return await chat_json_cached(
+            build_decompose_prompt(tone),
+            build_decompose_user_message(
+                sphere=sphere_name,
+                focus_text=focus_text,
+                raw_description=raw_text,
+            ),
+            refresh=refresh,
         )
     except Exception as e:
-        logger.error("Goal validation LLM failed: %s", e)
-        llm_result = {}
+        logger.error("Decomposition LLM failed: %s", e)
+        return {"weeks": [], "first_3_steps": []}
+
+
+def _start_speculative_decomp(state: FSMContext, goal_text: str, coro: Coroutine) -> None:
+    drop_speculative_decomp(state)
+    task = spawn(coro, name=f"speculative_decomp:{state.key.user_id}")
+    _speculative_decomps[state.key] = (goal_text, task)
+    if len(_speculative_decomps) > _MAX_SPECULATIVE_DECOMPS:
+        _, (_, oldest) = _speculative_decomps.popitem(last=False)
+        oldest.cancel()
+
+
+def drop_speculative_decomp(state: FSMContext) -> None:
+    """Cancel and forget this user's speculative decomposition, if any.
+
+    Must be called wherever onboarding state is reset (including /start).
+    """
+    entry = _speculative_decomps.pop(state.key, None)
+    if entry is not None:
+        entry[1].cancel()
+
+
+async def _handle_month_goal(
+    message: Message, state: FSMContext, user_db: User, raw_text: str,
+) -> None:
+    """Общая логика обработки свободного описания цели (текст или голос)."""
+    drop_speculative_decomp(state)
+    data = await state.get_data()
+    sphere_name, _ = _priority_sphere(data, data["current_priority_idx"])
+    # Only the goal being discussed lives in FSM; accepted ones are in the DB
+    goal = {"raw_text": raw_text}
+    await state.update_data(month_goal=goal)
+
+    if len(raw_text) < _MIN_GOAL_LEN or _NON_GOAL_RE.fullmatch(raw_text):
+        llm_result = _VAGUE_GOAL_VERDICT
+    else:
+        await message.answer("🤔 Оцениваю формулировку цели...")
+        sys_prompt = build_validate_goal_prompt(data.get("tone", "neutral"))
+        user_msg = build_validate_goal_user_message(sphere=sphere_name, goal_text=raw_text)
+        try:
+            llm_result = await chat_json_cached(sys_prompt, user_msg)
+        except Exception as e:
+            logger.error("Goal validation LLM failed: %s", e)
+            llm_result = {}
 
     score = llm_result.get("score", "ok")
     result_text = llm_result.get("result", raw_text[:150])
     analysis = llm_result.get("analysis", "")
     reframe = llm_result.get("reframe", "")
 
-    mf[sphere_name]["result"] = result_text
-    mf[sphere_name]["llm_score"] = score
-    mf[sphere_name]["llm_reframe"] = reframe
-    await state.update_data(monthly_focuses=mf)
-
-    score_emoji = {"ok": "✅", "vague": "🌫", "imposed": "🚩", "too_big": "📏"}.get(score, "❓")
-    score_label = {
-        "ok": "Отличная цель!",
-        "vague": "Расплывчато — давай конкретнее",
-        "imposed": "Похоже на навязанную цель",
-        "too_big": "Слишком много за 30 дней",
-    }.get(score, "")
-
-    display = (
-        f"🗓 *{sphere_name}*\n\n"
-        f"Цель: _{result_text}_\n\n"
-        f"{score_emoji} *{score_label}*"
+    goal.update(result=result_text, llm_score=score, llm_reframe=reframe)
+    await state.update_data(month_goal=goal)
+
+    score_emoji = _SCORE_EMOJI.get(score, "❓")
+    score_label = _SCORE_LABEL.get(score, "")
+
+    display = _MONTH_GOAL_VERDICT_TPL.format(
+        sphere=sphere_name, goal=result_text, emoji=score_emoji, label=score_label,
     )
     if analysis:
         display += f"\n{analysis}"
     if reframe and score != "ok":
         display += f"\n\n💡 *Предлагаю:*\n_{reframe}_"
 
+    if score == "ok":
+        # Most "ok" goals are accepted as is — start decomposing right away
+        _start_speculative_decomp(
+            state, result_text, _decompose(user_db.tone, sphere_name, result_text, raw_text),
+        )
+
     await message.answer(display, parse_mode="Markdown", reply_markup=goal_confirm_kb())
     await state.set_state(OnboardingStates.confirming_goal)
 
 
 @router.message(OnboardingStates.entering_month_result, F.text)
-async def on_month_goal_text(message: Message, state: FSMContext) -> None:
-    if message.text.strip() in _MENU_TEXTS:
+async def on_month_goal_text(message: Message, state: FSMContext, user_db: User) -> None:
+    text = message.text.strip()
+    if not text or text in _MENU_TEXTS:
         await message.answer("Ты в процессе настройки. Расскажи про цель на месяц — чего хочешь достичь и зачем?")
         return
-    await _handle_month_goal(message, state, message.text.strip())
+    await _handle_month_goal(message, state, user_db, text)
 
 
 @router.message(OnboardingStates.entering_month_result, F.voice)
@@ -455,7 +554,9 @@ async def on_month_goal_voice(message: Message, bot: Bot, state: FSMContext) ->
 
 
 @router.callback_query(OnboardingStates.entering_month_result, F.data == "vc_ok:month_goal")
-async def confirm_voice_month_goal(callback: CallbackQuery, state: FSMContext) -> None:
+async def confirm_voice_month_goal(
+    callback: CallbackQuery, state: FSMContext, user_db: User,
+) -> None:
     data = await state.get_data()
     text = data.get("voice_pending_month_goal", "")
     if not text:
@@ -463,100 +564,104 @@ async def confirm_voice_month_goal(callback: CallbackQuery, state: FSMContext) -
         return
     await callback.answer()  # must answer before LLM call in _handle_month_goal
     await callback.message.delete()
-    await _handle_month_goal(callback.message, state, text)
+    await _handle_month_goal(callback.message, state, user_db, text)
 
 
 @router.callback_query(OnboardingStates.entering_month_result, F.data == "vc_edit:month_goal")
 async def edit_voice_month_goal(callback: CallbackQuery) -> None:
-    await callback.message.edit_text("✏️ Напиши исправленный вариант:")
     await callback.answer()
+    await callback.message.edit_text("✏️ Напиши исправленный вариант:")
 
 
 @router.callback_query(OnboardingStates.confirming_goal, F.data == "goal_accept")
 async def on_goal_accept(
     callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
 ) -> None:
+    await _accept_goal(callback, state, db, user_db)
+
+
+async def _accept_goal(
+    callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
+    *, regenerate: bool = False,
+) -> None:
+    """Save the current monthly goal and show its decomposition.
+
+    ``regenerate`` bypasses the LLM cache so the user gets a fresh plan.
+    """
     data = await state.get_data()
-    idx = data["current_priority_idx"]
-    priorities = data["priority_spheres"]
-    sphere_name = priorities[idx]
-    mf = data["monthly_focuses"][sphere_name]
+    sphere_name, sphere_id = _priority_sphere(data, data["current_priority_idx"])
+    mf = data["month_goal"]
 
     # Acknowledge callback immediately — LLM decomp takes 10-20s
     await callback.answer()
 
-    # Save focus to DB
-    result = await db.execute(
-        select(Sphere).where(Sphere.user_id == user_db.id, Sphere.name == sphere_name)
-    )
-    sphere_obj = result.scalar_one_or_none()
-
-    focus = Focus(
-        user_id=user_db.id,
-        sphere_id=sphere_obj.id if sphere_obj else None,
-        period="month",
-        text=mf["result"],
-        meaning=mf.get("raw_text"),
-        llm_score=mf.get("llm_score"),
-        llm_reframe=mf.get("llm_reframe"),
-        is_active=True,
-    )
-    db.add(focus)
-    await db.commit()
-    await db.refresh(focus)
-
     # Decompose this focus
     await callback.message.edit_text("📋 Декомпозирую на недели и шаги...")
 
-    try:
-        decomp_result = await llm_client.chat_json(
-            system_prompt=build_decompose_prompt(user_db.tone),
-            user_message=build_decompose_user_message(
-                sphere=sphere_name,
-                focus_text=mf["result"],
-                raw_description=mf.get("raw_text", ""),
-            ),
+    speculative = _speculative_decomps.pop(state.key, None)
+    if speculative is not None and speculative[0] == mf["result"]:
+        decomp_result = await speculative[1]
+    else:
+        if speculative is not None:
+            speculative[1].cancel()
+        decomp_result = await _decompose(
+            user_db.tone, sphere_name, mf["result"], mf.get("raw_text", ""),
+            refresh=regenerate,
         )
-    except Exception as e:
-        logger.error("Decomposition LLM failed: %s", e)
-        decomp_result = {"weeks": [], "first_3_steps": []}
 
-    # Save steps to StepBank
+    # Focus + its steps in one transaction, written after the LLM call so no
+    # transaction is held open while waiting for it; RETURNING skips a refresh
+    focus_id = (await db.execute(
+        insert(Focus).values(
+            user_id=user_db.id,
+            sphere_id=sphere_id,
+            period="month",
+            text=mf["result"],
+            meaning=mf.get("raw_text"),
+            llm_score=mf.get("llm_score"),
+            llm_reframe=mf.get("llm_reframe"),
+            is_active=True,
+        ).returning(Focus.id)
+    )).scalar_one()
+
+    # Save steps to StepBank in one multi-row INSERT (insertmanyvalues)
     weeks = decomp_result.get("weeks", [])
-    for week_data in weeks:
-        wn = week_data.get("week", 1)
-        for i, step_data in enumerate(week_data.get("steps", [])):
-            step = StepBank(
-                focus_id=focus.id,
-                week_number=wn,
-                step_text=step_data.get("step", ""),
-                plan_b_text=step_data.get("plan_b", ""),
-                order=i,
-            )
-            db.add(step)
+    steps = [
+        {
+            "focus_id": focus_id,
+            "week_number": week_data.get("week", 1),
+            "step_text": step_data.get("step", ""),
+            "plan_b_text": step_data.get("plan_b", ""),
+            "order": i,
+        }
+        for week_data in weeks
+        for i, step_data in enumerate(week_data.get("steps", []))
+    ]
+    if steps:
+        await db.execute(insert(StepBank), steps)
     await db.commit()
 
     # Format decomposition for display
-    decomp_text = f"📋 *Декомпозиция: {sphere_name}*\n\n"
+    parts = [f"📋 *Декомпозиция: {sphere_name}*\n\n"]
     for week_data in weeks:
         wn = week_data.get("week", "?")
         wr = week_data.get("result", "")
-        decomp_text += f"*Неделя {wn}:* {wr}\n"
+        parts.append(f"*Неделя {wn}:* {wr}\n")
         for step_data in week_data.get("steps", [])[:3]:
             step = step_data.get("step", "")
             plan_b = step_data.get("plan_b", "")
-            decomp_text += f"  • {step}\n"
+            parts.append(f"  • {step}\n")
             if plan_b:
-                decomp_text += f"    _Plan B (10 мин):_ {plan_b}\n"
-        decomp_text += "\n"
+                parts.append(f"    _Plan B (10 мин):_ {plan_b}\n")
+        parts.append("\n")
 
     first_steps = decomp_result.get("first_3_steps", [])
     if first_steps:
-        decomp_text += "🔥 *Первые 3 шага на эту неделю:*\n"
-        for i, s in enumerate(first_steps, 1):
-            decomp_text += f"  {i}. {s}\n"
+        parts.append("🔥 *Первые 3 шага на эту неделю:*\n")
+        parts.extend(f"  {i}. {s}\n" for i, s in enumerate(first_steps, 1))
+    decomp_text = "".join(parts)
 
-    await state.update_data(current_focus_id=focus.id)
+    await state.update_data(current_focus_id=focus_id)
 
     await callback.message.edit_text(
         decomp_text,
@@ -570,17 +675,18 @@ async def on_goal_accept(
 async def on_goal_reframe(
     callback: CallbackQuery, state: FSMContext,
 ) -> None:
+    await callback.answer()
+    drop_speculative_decomp(state)  # the goal wording is about to change
     data = await state.get_data()
-    idx = data["current_priority_idx"]
-    sphere_name = data["priority_spheres"][idx]
-    mf = data["monthly_focuses"][sphere_name]
+    sphere_name, _ = _priority_sphere(data, data["current_priority_idx"])
+    mf = data["month_goal"]
     reframe = mf.get("llm_reframe", "")
 
     if reframe:
         # Update result to the reframe so "Принять" will accept it
         mf["result"] = reframe
         mf["llm_score"] = "ok"
-        await state.update_data(monthly_focuses=data["monthly_focuses"])
+        await state.update_data(month_goal=mf)
         await callback.message.edit_text(
             f"💡 *Переформулировка для {sphere_name}:*\n\n"
             f"_{reframe}_\n\n"
@@ -593,36 +699,34 @@ async def on_goal_reframe(
             "Нет готовой переформулировки. Попробуй написать заново:",
             reply_markup=goal_confirm_kb(),
         )
-    await callback.answer()
 
 
 @router.message(OnboardingStates.confirming_goal, F.text)
-async def on_goal_manual_edit(message: Message, state: FSMContext) -> None:
+async def on_goal_manual_edit(message: Message, state: FSMContext, user_db: User) -> None:
     """User typed their own wording while in the confirmation stage."""
-    if message.text.strip() in _MENU_TEXTS:
+    text = message.text.strip()
+    if not text or text in _MENU_TEXTS:
         await message.answer(
             "Ты в процессе настройки цели. Нажми «✅ Принимаю», «📝 Написать заново» "
             "или напечатай свою формулировку."
         )
         return
     # Run validation on the manually typed text
-    await _handle_month_goal(message, state, message.text.strip())
+    await _handle_month_goal(message, state, user_db, text)
 
 
 @router.callback_query(OnboardingStates.confirming_goal, F.data == "goal_rewrite")
 async def on_goal_rewrite(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    drop_speculative_decomp(state)  # the goal wording is about to change
     data = await state.get_data()
-    idx = data["current_priority_idx"]
-    sphere_name = data["priority_spheres"][idx]
+    sphere_name, _ = _priority_sphere(data, data["current_priority_idx"])
 
     await callback.message.edit_text(
-        f"🗓 *{sphere_name}*\n\n"
-        "Расскажи заново — чего хочешь достичь и зачем?\n"
-        "Голосом или текстом, свободно.",
+        _MONTH_GOAL_REWRITE_TPL.format(sphere=sphere_name),
         parse_mode="Markdown",
     )
     await state.set_state(OnboardingStates.entering_month_result)
-    await callback.answer()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -633,19 +737,16 @@ async def on_goal_rewrite(callback: CallbackQuery, state: FSMContext) -> None:
 async def on_decomp_accept(
     callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
 ) -> None:
+    await callback.answer()
     data = await state.get_data()
-    idx = data["current_priority_idx"]
-    priorities = data["priority_spheres"]
+    next_idx = data["current_priority_idx"] + 1
 
     # Move to next priority sphere or proceed to weekly focus
-    next_idx = idx + 1
-    if next_idx < len(priorities):
+    if next_idx < len(data["priority_idx"]):
         await state.update_data(current_priority_idx=next_idx)
-        sphere_name = priorities[next_idx]
+        sphere_name, _ = _priority_sphere(data, next_idx)
         await callback.message.edit_text(
-            f"🗓 *Месячный фокус: {sphere_name}*\n\n"
-            "Расскажи про цель на этот месяц — чего хочешь достичь и зачем?\n\n"
-            "Пиши свободно, голосом или текстом.",
+            _MONTH_GOAL_ASK_TPL.format(sphere=sphere_name),
             parse_mode="Markdown",
         )
         await state.set_state(OnboardingStates.entering_month_result)
@@ -653,7 +754,6 @@ async def on_decomp_accept(
         # All priorities done — choose weekly focus
         await _ask_weekly_focus(callback.message, state, db, user_db)
 
-    await callback.answer()
 
 
 @router.callback_query(OnboardingStates.reviewing_decomposition, F.data == "decomp_regen")
@@ -661,7 +761,7 @@ async def on_decomp_regen(
     callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
 ) -> None:
     # Re-run decomposition (re-trigger goal_accept logic)
-    await on_goal_accept(callback, state, db, user_db)
+    await _accept_goal(callback, state, db, user_db, regenerate=True)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -671,16 +771,8 @@ async def on_decomp_regen(
 async def _ask_weekly_focus(
     message, state: FSMContext, db: AsyncSession, user_db: User,
 ) -> None:
-    result = await db.execute(
-        select(Focus).where(
-            Focus.user_id == user_db.id,
-            Focus.period == "month",
-            Focus.is_active.is_(True),
-        )
-    )
-    monthly_focuses = result.scalars().all()
-
-    options = [(f.id, f.text) for f in monthly_focuses]
+    result = await db.execute(_ACTIVE_MONTHLY_FOCUSES, {"uid": user_db.id})
+    options = [(fid, text) for fid, text in result.all()]
     await state.update_data(selected_weekly_ids=[])
 
     await message.edit_text(
@@ -708,7 +800,8 @@ async def on_weekly_toggle(callback: CallbackQuery, state: FSMContext) -> None:
             return
         selected_ids.append(fid)
 
-    await state.update_data(selected_weekly_ids=selected_ids)
+    data["selected_weekly_ids"] = selected_ids
+    await state.set_data(data)
     await callback.answer(f"Выбрано: {len(selected_ids)}")
 
 
@@ -722,22 +815,23 @@ async def on_weekly_done(
     if not selected_ids:
         await callback.answer("Выбери хотя бы 1 фокус", show_alert=True)
         return
+    await callback.answer()
 
-    # Create weekly focuses from monthly ones
-    for fid in selected_ids:
-        result = await db.execute(select(Focus).where(Focus.id == fid))
-        monthly = result.scalar_one_or_none()
-        if monthly:
-            weekly = Focus(
-                user_id=user_db.id,
-                sphere_id=monthly.sphere_id,
-                period="week",
-                text=monthly.text,
-                meaning=monthly.meaning,
-                is_active=True,
-                week_number=1,
-            )
-            db.add(weekly)
+    # Create weekly focuses from monthly ones — INSERT ... SELECT, no row trip
+    await db.execute(
+        insert(Focus).from_select(
+            ["user_id", "sphere_id", "period", "text", "meaning", "is_active", "week_number"],
+            select(
+                Focus.user_id,
+                Focus.sphere_id,
+                literal("week"),
+                Focus.text,
+                Focus.meaning,
+                true(),
+                literal(1),
+            ).where(Focus.id.in_(selected_ids), Focus.user_id == user_db.id),
+        )
+    )
     await db.commit()
 
     # Move to settings
@@ -748,45 +842,65 @@ async def on_weekly_done(
         reply_markup=tone_kb(),
     )
     await state.set_state(OnboardingStates.choosing_tone)
-    await callback.answer()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # STEP 6: SETTINGS (tone + times)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@router.callback_query(OnboardingStates.choosing_tone, F.data.startswith("tone:"))
-async def on_tone_chosen(
-    callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
-) -> None:
-    tone = callback.data.split(":", 1)[1]
-    user_db.tone = tone
-    await db.commit()
-
-    await callback.message.edit_text(
-        "🌅 В какое время утром присылать пинг для mind dump?",
-        reply_markup=time_picker_kb("morning"),
-    )
-    await state.set_state(OnboardingStates.choosing_morning_time)
-    await callback.answer()
+@dataclass(frozen=True)
+class _SettingsStep:
+    """One intermediate settings step: where the answer goes and what comes next."""
+    prefix: str        # callback_data prefix, "tone:" etc.
+    data_key: str      # FSM draft key (same name as the User column)
+    next_state: State
+    prompt: str
+    keyboard: Callable[[], InlineKeyboardMarkup]
+
+
+_SETTINGS_STEPS: dict[str, _SettingsStep] = {
+    OnboardingStates.choosing_tone.state: _SettingsStep(
+        prefix="tone:",
+        data_key="tone",
+        next_state=OnboardingStates.choosing_morning_time,
+        prompt="🌅 В какое время утром присылать пинг для mind dump?",
+        keyboard=lambda: time_picker_kb("morning"),
+    ),
+    OnboardingStates.choosing_morning_time.state: _SettingsStep(
+        prefix="morning_time:",
+        data_key="morning_ping_time",
+        next_state=OnboardingStates.choosing_evening_time,
+        prompt="🌙 В какое время вечером напомнить о закрытии дня?",
+        keyboard=lambda: time_picker_kb("evening"),
+    ),
+}
 
 
 @router.callback_query(
-    OnboardingStates.choosing_morning_time, F.data.startswith("morning_time:")
+    StateFilter(OnboardingStates.choosing_tone, OnboardingStates.choosing_morning_time),
+    F.data.regexp(r"^(tone|morning_time):"),
 )
-async def on_morning_time(
-    callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
-) -> None:
-    time_str = callback.data.split(":", 1)[1]
-    user_db.morning_ping_time = time_str
-    await db.commit()
-
-    await callback.message.edit_text(
-        "🌙 В какое время вечером напомнить о закрытии дня?",
-        reply_markup=time_picker_kb("evening"),
-    )
-    await state.set_state(OnboardingStates.choosing_evening_time)
+async def on_settings_step(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
+    step = _SETTINGS_STEPS[await state.get_state()]
+    if not callback.data.startswith(step.prefix):
+        return  # stale button from the other step
+
+    # Settings stay in the FSM draft until the last step commits them together
+    await state.update_data({step.data_key: callback.data[len(step.prefix):]})
+    await state.set_state(step.next_state)
+    await callback.message.edit_text(step.prompt, reply_markup=step.keyboard())
+
+
+_COMPLETE_TPL = (
+    "✅ *Настройка завершена!*\n\n"
+    "*Приоритетные сферы:*\n{priorities}\n\n"
+    "Утренний пинг: {morning}\n"
+    "Вечерний отчёт: {evening}\n"
+    "Тон: {tone}\n\n"
+    "Ты можешь сделать mind dump прямо сейчас — "
+    "отправь голосовое или текст. Поехали! 🚀"
+)
 
 
 @router.callback_query(
@@ -795,27 +909,44 @@ async def on_morning_time(
 async def on_evening_time(
     callback: CallbackQuery, state: FSMContext, db: AsyncSession, user_db: User,
 ) -> None:
-    time_str = callback.data.split(":", 1)[1]
-    user_db.evening_report_time = time_str
-    user_db.onboarding_complete = True
+    await callback.answer()
+    data = await state.get_data()
+    tone = data.get("tone", user_db.tone)
+    morning_ping_time = data.get("morning_ping_time", user_db.morning_ping_time)
+    evening_report_time = callback.data.split(":", 1)[1]
+    # Plain UPDATE — no unit-of-work flush for four known columns
+    await db.execute(
+        update(User)
+        .where(User.id == user_db.id)
+        .values(
+            tone=tone,
+            morning_ping_time=morning_ping_time,
+            evening_report_time=evening_report_time,
+            onboarding_complete=True,
+        )
+        .execution_options(synchronize_session=False)
+    )
     await db.commit()
 
-    await log_event(db, "onboarding_complete", user_id=user_db.id)
+    log_event_bg("onboarding_complete", user_id=user_db.id)
 
     # Summary
-    priorities = (await state.get_data()).get("priority_spheres", [])
-    pri_text = "\n".join(f"  • {p}" for p in priorities)
+    names = _sphere_names(data)
+    pri_text = "\n".join(f"  • {names[i]}" for i in data.get("priority_idx", []))
 
-    await callback.message.edit_text(
-        "✅ *Настройка завершена!*\n\n"
-        f"*Приоритетные сферы:*\n{pri_text}\n\n"
-        f"Утренний пинг: {user_db.morning_ping_time}\n"
-        f"Вечерний отчёт: {user_db.evening_report_time}\n"
-        f"Тон: {user_db.tone}\n\n"
-        "Ты можешь сделать mind dump прямо сейчас — "
-        "отправь голосовое или текст. Поехали! 🚀",
-        parse_mode="Markdown",
-    )
-    await callback.message.answer("Главное меню:", reply_markup=main_menu_kb())
+    # A reply keyboard cannot ride on an edited message, so the menu needs
+    # its own send — but the two calls are independent and go out together.
+    drop_speculative_decomp(state)
     await state.clear()
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.edit_text(
+            _COMPLETE_TPL.format(
+                priorities=pri_text,
+                morning=morning_ping_time,
+                evening=evening_report_time,
+                tone=tone,
+            ),
+            parse_mode="Markdown",
+        ),
+        callback.message.answer("Главное меню:", reply_markup=main_menu_kb()),
+    )
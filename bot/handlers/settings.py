@@ -4,17 +4,16 @@ from __future__ import annotations
 
 import logging
 
-import tempfile
-from pathlib import Path
-
 from aiogram import Bot, Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from bot.db.models import User, Focus
 from bot.keyboards.inline import settings_kb, tone_kb, time_picker_kb, main_menu_kb, focus_view_kb, voice_confirm_kb
+from bot.services.transcriber import transcriber
 from bot.states.fsm import SettingsStates
 
 logger = logging.getLogger(__name__)
@@ -94,6 +93,17 @@ async def set_monthly_focus(callback: CallbackQuery, state: FSMContext) -> None:
 
 # ── Handle inline value changes (tone, times) ─────────────────────────────────
 
+async def _update_user(db: AsyncSession, user_db: User, **values: str) -> None:
+    """Single-column UPDATE + commit, skipping the ORM dirty-check flush."""
+    await db.execute(
+        update(User)
+        .where(User.id == user_db.id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
 @router.callback_query(SettingsStates.editing_value, F.data.startswith("tone:"))
 async def on_tone_edit(
     callback: CallbackQuery,
@@ -102,8 +112,7 @@ async def on_tone_edit(
     user_db: User,
 ) -> None:
     tone = callback.data.split(":", 1)[1]
-    user_db.tone = tone
-    await db.commit()
+    await _update_user(db, user_db, tone=tone)
     await callback.message.edit_text(f"✅ Тон изменён: {tone}")
     await state.clear()
     await callback.answer()
@@ -119,8 +128,7 @@ async def on_morning_edit(
     user_db: User,
 ) -> None:
     time_str = callback.data.split(":", 1)[1]
-    user_db.morning_ping_time = time_str
-    await db.commit()
+    await _update_user(db, user_db, morning_ping_time=time_str)
     await callback.message.edit_text(f"✅ Утренний пинг: {time_str}")
     await state.clear()
     await callback.answer()
@@ -136,8 +144,7 @@ async def on_evening_edit(
     user_db: User,
 ) -> None:
     time_str = callback.data.split(":", 1)[1]
-    user_db.evening_report_time = time_str
-    await db.commit()
+    await _update_user(db, user_db, evening_report_time=time_str)
     await callback.message.edit_text(f"✅ Вечерний отчёт: {time_str}")
     await state.clear()
     await callback.answer()
@@ -145,6 +152,26 @@ async def on_evening_edit(
 
 # ── Handle text value changes (focuses) ────────────────────────────────────────
 
+# Built once at import; per call only the parameters change
+_UPDATE_FIRST_ACTIVE_FOCUS = (
+    update(Focus)
+    .where(
+        Focus.id == select(Focus.id)
+        .where(
+            Focus.user_id == bindparam("uid"),
+            Focus.period == bindparam("focus_period"),
+            Focus.is_active.is_(True),
+        )
+        .order_by(Focus.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    .values(text=bindparam("focus_text"))
+    .returning(Focus.id)
+    .execution_options(synchronize_session=False)
+)
+
+
 @router.message(SettingsStates.editing_value, F.text)
 async def on_text_setting(
     message: Message,
@@ -158,19 +185,15 @@ async def on_text_setting(
 
     if key in ("weekly_focus", "monthly_focus"):
         period = "week" if key == "weekly_focus" else "month"
+        # Users may hold several active focuses per period (one per sphere),
+        # so there is no unique key to upsert on: update the first one in place
+        # and insert only when the UPDATE matched nothing.
         result = await db.execute(
-            select(Focus).where(
-                Focus.user_id == user_db.id,
-                Focus.period == period,
-                Focus.is_active.is_(True),
-            )
+            _UPDATE_FIRST_ACTIVE_FOCUS,
+            {"uid": user_db.id, "focus_period": period, "focus_text": text},
         )
-        focus = result.scalars().first()
-        if focus:
-            focus.text = text
-        else:
-            focus = Focus(user_id=user_db.id, period=period, text=text, is_active=True)
-            db.add(focus)
+        if result.scalar() is None:
+            db.add(Focus(user_id=user_db.id, period=period, text=text, is_active=True))
         await db.commit()
         label = "недели" if period == "week" else "месяца"
         await message.answer(
@@ -192,21 +215,15 @@ async def on_voice_setting(
     db: AsyncSession,
     user_db: User,
 ) -> None:
-    from bot.services.transcriber import transcriber
-
     file = await bot.get_file(message.voice.file_id)
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-        tmp_path = tmp.name
-    await bot.download_file(file.file_path, tmp_path)
+    buf = await bot.download_file(file.file_path)
 
     try:
-        text = await transcriber.transcribe(tmp_path)
+        text = await transcriber.transcribe_bytes(buf.getvalue())
     except Exception as e:
         logger.error("Settings voice transcription failed: %s", e)
         await message.answer("Не удалось распознать. Напиши текстом.")
         return
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
 
     if not text.strip():
         await message.answer("Не удалось распознать речь. Напиши текстом.")
@@ -251,7 +268,9 @@ async def view_weekly_focus(
         await message.answer("Сначала пройди настройку: /start")
         return
     result = await db.execute(
-        select(Focus).where(
+        select(Focus)
+        .options(joinedload(Focus.sphere))
+        .where(
             Focus.user_id == user_db.id,
             Focus.period == "week",
             Focus.is_active.is_(True),
@@ -281,7 +300,9 @@ async def view_monthly_focus(
         await message.answer("Сначала пройди настройку: /start")
         return
     result = await db.execute(
-        select(Focus).where(
+        select(Focus)
+        .options(joinedload(Focus.sphere))
+        .where(
             Focus.user_id == user_db.id,
             Focus.period == "month",
             Focus.is_active.is_(True),
@@ -7,6 +7,7 @@ from aiogram.types import Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import User
+from bot.handlers.onboarding import drop_speculative_decomp
 from bot.keyboards.inline import main_menu_kb, spheres_kb
 from bot.states.fsm import OnboardingStates
 from bot.utils.analytics import log_event
@@ -21,6 +22,9 @@ async def cmd_start(
     db: AsyncSession,
     user_db: User,
 ) -> None:
+    # /start mid-onboarding abandons any goal being decomposed in the background
+    drop_speculative_decomp(state)
+
     if user_db.onboarding_complete:
         await message.answer(
             f"Привет, {user_db.first_name}! 👋\n\n"
@@ -45,4 +49,4 @@ async def cmd_start(
         reply_markup=spheres_kb(),
     )
     await state.set_state(OnboardingStates.choosing_spheres)
-    await state.update_data(selected_spheres=[])
+    await state.update_data(sphere_mask=0, custom_spheres=[])
@@ -3,15 +3,13 @@
 from __future__ import annotations
 
 import logging
-import tempfile
-from datetime import date, timedelta
-from pathlib import Path
+from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot, Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import User, TodoItem
@@ -26,23 +24,18 @@ router = Router()
 
 def _user_today(user: User) -> date:
     tz = ZoneInfo(user.tz_personal or "Europe/Moscow")
-    from datetime import datetime
     return datetime.now(tz).date()
 
 
 async def _transcribe_voice(message: Message, bot: Bot) -> str | None:
     file = await bot.get_file(message.voice.file_id)
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-        tmp_path = tmp.name
-    await bot.download_file(file.file_path, tmp_path)
+    buf = await bot.download_file(file.file_path)
     try:
-        text = await transcriber.transcribe(tmp_path)
+        text = await transcriber.transcribe_bytes(buf.getvalue())
         return text.strip() or None
     except Exception as e:
         logger.error("Todo transcription failed: %s", e)
         return None
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
 
 
 def _parse_todo_lines(raw: str) -> list[str]:
@@ -62,24 +55,20 @@ async def _save_todos(
     texts: list[str],
     today: date,
     carried_from_ids: list[int] | None = None,
-) -> list[TodoItem]:
-    todos = []
-    for i, text in enumerate(texts):
-        carried_from = carried_from_ids[i] if carried_from_ids else None
-        item = TodoItem(
-            user_id=user_db.id,
-            session_id=session_id,
-            date_local=today,
-            text=text,
-            status="pending",
-            carried_from_id=carried_from,
-        )
-        db.add(item)
-        todos.append(item)
+) -> None:
+    # One multi-row INSERT (insertmanyvalues); callers re-query what they show
+    await db.execute(insert(TodoItem), [
+        {
+            "user_id": user_db.id,
+            "session_id": session_id,
+            "date_local": today,
+            "text": text,
+            "status": "pending",
+            "carried_from_id": carried_from_ids[i] if carried_from_ids else None,
+        }
+        for i, text in enumerate(texts)
+    ])
     await db.commit()
-    for item in todos:
-        await db.refresh(item)
-    return todos
 
 
 async def _get_pending_todos(
@@ -267,7 +256,6 @@ async def on_todo_carry(
 
     # Create new item for tomorrow (no session_id yet — will be attached when user does dump)
     tz = ZoneInfo(user_db.tz_personal or "Europe/Moscow")
-    from datetime import datetime
     tomorrow = datetime.now(tz).date() + timedelta(days=1)
     new_item = TodoItem(
         user_id=user_db.id,
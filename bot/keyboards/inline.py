@@ -1,5 +1,7 @@
 """Inline and reply keyboard builders."""
 
+from functools import lru_cache
+
 from aiogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
@@ -10,7 +12,9 @@ from aiogram.types import (
 
 # ── Main menu (ReplyKeyboard, persistent) ──────────────────────────────────────
 
+@lru_cache(maxsize=1)
 def main_menu_kb() -> ReplyKeyboardMarkup:
+    """Constant markup — built once and shared by every reply."""
     return ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text="🧠 Dump"), KeyboardButton(text="🎯 Фокус дня")],
@@ -37,18 +41,21 @@ PRESET_SPHERES = [
 ]
 
 
-def spheres_kb(selected: set[str] | None = None) -> InlineKeyboardMarkup:
-    selected = selected or set()
+@lru_cache(maxsize=512)
+def spheres_kb(mask: int = 0, custom: tuple[str, ...] = ()) -> InlineKeyboardMarkup:
+    """`mask` has bit i set for PRESET_SPHERES[i]; `custom` lists the user's own (always selected).
+
+    Markups are never mutated after build, so one instance per selection is shared.
+    """
     buttons = []
     # Preset spheres (use index as callback_data to stay within 64 bytes)
     for i, s in enumerate(PRESET_SPHERES):
-        check = "✅ " if s in selected else ""
+        check = "✅ " if mask >> i & 1 else ""
         buttons.append([InlineKeyboardButton(
             text=f"{check}{s}",
             callback_data=f"sphere:{i}",
         )])
     # Custom spheres added by user (not in presets)
-    custom = sorted(s for s in selected if s not in PRESET_SPHERES)
     for j, s in enumerate(custom):
         buttons.append([InlineKeyboardButton(
             text=f"✅ {s}",
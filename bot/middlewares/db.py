@@ -1,16 +1,35 @@
-"""Middleware that injects DB session + ensures User row exists."""
+"""Middleware that injects DB session + ensures User row exists.
+
+Registered once as an outer middleware on `dp.update`, so every update
+(message, callback, ...) goes through a single session setup.
+"""
 
 from __future__ import annotations
 
 from typing import Any, Awaitable, Callable
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, Message, CallbackQuery
+from aiogram.types import TelegramObject
 from sqlalchemy import select
+from sqlalchemy.orm import load_only
 
 from bot.db.models import User
 from bot.db.session import async_session
 
+# Every User attribute handlers and the scheduler read from `user_db`.
+# Anything else (username, created_at) is left unloaded and raises on access
+# instead of silently lazy-loading outside the greenlet.
+USER_REQUEST_COLUMNS = (
+    User.id,
+    User.tg_id,
+    User.first_name,
+    User.tone,
+    User.tz_personal,
+    User.morning_ping_time,
+    User.evening_report_time,
+    User.onboarding_complete,
+)
+
 
 class DbSessionMiddleware(BaseMiddleware):
     """Injects `db` (AsyncSession) and `user_db` (User) into handler data."""
@@ -24,16 +43,14 @@ class DbSessionMiddleware(BaseMiddleware):
         async with async_session() as session:
             data["db"] = session
 
-            # Resolve telegram user
-            tg_user = None
-            if isinstance(event, Message) and event.from_user:
-                tg_user = event.from_user
-            elif isinstance(event, CallbackQuery) and event.from_user:
-                tg_user = event.from_user
+            # Resolved by aiogram's UserContextMiddleware for any update type
+            tg_user = data.get("event_from_user")
 
             if tg_user:
                 result = await session.execute(
-                    select(User).where(User.tg_id == tg_user.id)
+                    select(User)
+                    .options(load_only(*USER_REQUEST_COLUMNS, raiseload=True))
+                    .where(User.tg_id == tg_user.id)
                 )
                 user_db = result.scalar_one_or_none()
                 if user_db is None:
@@ -43,8 +60,9 @@ class DbSessionMiddleware(BaseMiddleware):
                         username=tg_user.username,
                     )
                     session.add(user_db)
+                    # id comes back via INSERT ... RETURNING and attributes
+                    # survive commit (expire_on_commit=False) — no refresh needed
                     await session.commit()
-                    await session.refresh(user_db)
                 data["user_db"] = user_db
             else:
                 data["user_db"] = None
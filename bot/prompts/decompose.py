@@ -2,7 +2,10 @@
 
 # Version: 2.0
 
+from functools import lru_cache
 
+
+@lru_cache(maxsize=8)
 def build_decompose_prompt(tone: str) -> str:
     return f"""Ты — строгий коуч-ассистент «Mastermind Coach». Пользователь утвердил месячный фокус.
 
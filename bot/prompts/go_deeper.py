@@ -2,6 +2,8 @@
 
 # Version: 1.0
 
+from functools import lru_cache
+
 _TONE_MAP = {
     "neutral": "Говори нейтрально, как профессиональный коуч.",
     "soft": "Говори мягко и поддерживающе, как заботливый наставник.",
@@ -9,6 +11,7 @@ _TONE_MAP = {
 }
 
 
+@lru_cache(maxsize=8)
 def build_deeper_prompt(tone: str) -> str:
     tone_instruction = _TONE_MAP.get(tone, _TONE_MAP["neutral"])
 
@@ -2,6 +2,8 @@
 
 # Version: 2.1 — accepts free-form user description instead of 4 structured fields
 
+from functools import lru_cache
+
 _TONE_MAP = {
     "neutral": "Говори нейтрально и по делу.",
     "soft": "Говори мягко и поддерживающе.",
@@ -9,6 +11,8 @@ _TONE_MAP = {
 }
 
 
+# Pure function of a handful of tone values — render each variant once
+@lru_cache(maxsize=8)
 def build_validate_goal_prompt(tone: str) -> str:
     tone_instruction = _TONE_MAP.get(tone, _TONE_MAP["neutral"])
 
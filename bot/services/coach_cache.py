@@ -0,0 +1,120 @@
+"""In-process TTL/LRU caches for LLM results.
+
+Users often resend the same dump (double tap, voice re-recorded to the same
+text), and many onboarding goals are phrased identically ("выучить
+английский"). Identical prompts produce an equivalent answer, so the LLM
+round-trip can be skipped.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Generic, Hashable, Optional, TypeVar
+
+from bot.services.coach_engine import coach, DumpAnalysis
+from bot.services.llm_client import llm_client
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """Bounded LRU mapping whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+_analysis_cache: TTLCache[DumpAnalysis] = TTLCache(maxsize=2048, ttl=86400)
+_chat_json_cache: TTLCache[dict[str, Any]] = TTLCache(maxsize=10_000, ttl=86400)
+
+
+def _dump_key(text: str, *context: str) -> bytes:
+    h = blake2b(text.lower().strip().encode(), digest_size=16)
+    for part in context:
+        h.update(b"\x00")
+        h.update(part.encode())
+    return h.digest()
+
+
+async def analyze_mind_dump_cached(
+    text: str,
+    weekly_focus: str,
+    monthly_focus: str,
+    tone: str,
+    spheres: str = "",
+) -> DumpAnalysis:
+    """coach.analyze_mind_dump with results cached on normalized input."""
+    key = _dump_key(text, weekly_focus, monthly_focus, tone, spheres)
+    cached = _analysis_cache.get(key)
+    if cached is not None:
+        logger.debug(
+            "Dump analysis cache hit (hits=%d misses=%d)",
+            _analysis_cache.hits, _analysis_cache.misses,
+        )
+        return cached
+
+    analysis = await coach.analyze_mind_dump(
+        text=text,
+        weekly_focus=weekly_focus,
+        monthly_focus=monthly_focus,
+        tone=tone,
+        spheres=spheres,
+    )
+    # Failed analyses must be retried on the next attempt, never replayed
+    if "error" not in analysis.raw and analysis.option_a is not None:
+        _analysis_cache.set(key, analysis)
+    return analysis
+
+
+async def chat_json_cached(
+    system_prompt: str, user_message: str, *, refresh: bool = False,
+) -> dict[str, Any]:
+    """llm_client.chat_json memoized on the exact prompt pair.
+
+    ``refresh`` skips the lookup (the user explicitly asked for a new answer)
+    but still stores the fresh result.
+    """
+    h = blake2b(system_prompt.encode(), digest_size=16)
+    h.update(b"\x00")
+    h.update(user_message.encode())
+    key = h.digest()
+    if not refresh:
+        cached = _chat_json_cache.get(key)
+        if cached is not None:
+            logger.debug(
+                "LLM JSON cache hit (hits=%d misses=%d)",
+                _chat_json_cache.hits, _chat_json_cache.misses,
+            )
+            return cached
+
+    result = await llm_client.chat_json(system_prompt=system_prompt, user_message=user_message)
+    # {} is chat_json's failure value — retry next time instead of replaying it
+    if result:
+        _chat_json_cache.set(key, result)
+    return result
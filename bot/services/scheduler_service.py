@@ -3,16 +3,17 @@
 from __future__ import annotations
 
 import logging
-from datetime import date as date_type, datetime, timedelta, time as dt_time
+from datetime import date as date_type, datetime, timedelta, time as dt_time, timezone
 from zoneinfo import ZoneInfo
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
-from sqlalchemy import select
+from sqlalchemy import select, text
 
-from bot.db.models import User, DailySession
+from bot.db.models import User, DailySession, event_partition_ddl
 from bot.db.session import async_session
+from bot.keyboards.inline import checkin_kb, evening_status_kb, morning_ping_kb
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +36,6 @@ async def send_morning_ping(user_tg_id: int) -> None:
         logger.error("Bot not set in scheduler")
         return
 
-    from bot.keyboards.inline import morning_ping_kb
-
     try:
         await _bot.send_message(
             chat_id=user_tg_id,
@@ -55,8 +54,6 @@ async def send_checkin(user_tg_id: int, session_id: int, kind: str) -> None:
     if _bot is None:
         return
 
-    from bot.keyboards.inline import checkin_kb
-
     hour_label = "3 часа" if kind == "t3" else "6 часов"
 
     try:
@@ -77,8 +74,6 @@ async def send_evening_reminder(user_tg_id: int, session_id: int, attempt: int =
     if _bot is None:
         return
 
-    from bot.keyboards.inline import evening_status_kb
-
     if attempt == 1:
         text = (
             "🌙 Время закрыть день!\n\n"
@@ -183,6 +178,25 @@ def schedule_evening_reminders(
     logger.info("Scheduled evening reminders for session %s at %s", session.id, evening_dt)
 
 
+# ── Analytics partitions ───────────────────────────────────────────────────────
+
+async def ensure_event_partitions() -> None:
+    """Make sure this month's and next month's `events` partitions exist (UTC months).
+
+    Next month's must exist before the month starts: once rows for that month
+    land in events_default, the partition can no longer be created.
+    """
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    next_month = (this_month + timedelta(days=32)).replace(day=1)
+    for start in (this_month, next_month):
+        try:
+            async with async_session() as db:
+                await db.execute(text(event_partition_ddl(start)))
+                await db.commit()
+        except Exception as e:
+            logger.error("Failed to create events partition for %s: %s", start, e)
+
+
 # ── Rebuild all scheduled jobs from DB on startup ──────────────────────────────
 
 async def rebuild_schedules() -> None:
@@ -213,22 +227,17 @@ async def rebuild_schedules() -> None:
         logger.info("Rebuilt morning pings for %d users", len(users))
 
         # Rebuild checkins and evening reminders for TODAY's active sessions only
-        from datetime import timezone
         today_utc = datetime.now(timezone.utc).date()
+        # Sessions and their owners in one query instead of a User SELECT per session
         today_sessions = await db.execute(
-            select(DailySession).where(
+            select(DailySession, User)
+            .join(User, User.id == DailySession.user_id)
+            .where(
                 DailySession.accepted_at.isnot(None),
                 DailySession.date_local == today_utc,
             )
         )
-        for session in today_sessions.scalars().all():
-            user_result = await db.execute(
-                select(User).where(User.id == session.user_id)
-            )
-            user = user_result.scalar_one_or_none()
-            if not user:
-                continue
-
+        for session, user in today_sessions.all():
             tz = ZoneInfo(user.tz_personal or "Europe/Moscow")
             now = datetime.now(tz)
 
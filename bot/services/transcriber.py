@@ -18,6 +18,11 @@ class BaseTranscriber(ABC):
     async def transcribe(self, file_path: str | Path) -> str:
         ...
 
+    @abstractmethod
+    async def transcribe_bytes(self, data: bytes, filename: str = "voice.ogg") -> str:
+        """Transcribe in-memory audio; `filename` only hints the container format."""
+        ...
+
 
 class WhisperTranscriber(BaseTranscriber):
     def __init__(self) -> None:
@@ -38,6 +43,15 @@ class WhisperTranscriber(BaseTranscriber):
             )
         return response.text
 
+    async def transcribe_bytes(self, data: bytes, filename: str = "voice.ogg") -> str:
+        logger.info("Transcribing %s (%d bytes, in memory)", filename, len(data))
+        response = await self._client.audio.transcriptions.create(
+            model=self._model,
+            file=(filename, data),
+            language="ru",
+        )
+        return response.text
+
 
 # Singleton
 transcriber: BaseTranscriber = WhisperTranscriber()
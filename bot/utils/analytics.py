@@ -8,6 +8,8 @@ from typing import Any
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import Event
+from bot.db.session import async_session
+from bot.utils.background import spawn
 
 logger = logging.getLogger(__name__)
 
@@ -26,3 +28,25 @@ async def log_event(
     session.add(event)
     await session.commit()
     logger.debug("Event logged: %s user=%s", event_type, user_id)
+
+
+async def _log_event_own_session(
+    event_type: str,
+    user_id: int | None,
+    metadata: dict[str, Any] | None,
+) -> None:
+    async with async_session() as session:
+        await log_event(session, event_type, user_id=user_id, metadata=metadata)
+
+
+def log_event_bg(
+    event_type: str,
+    user_id: int | None = None,
+    metadata: dict[str, Any] | None = None,
+) -> None:
+    """Like log_event, but off the request path: writes on its own session
+    in a background task, so the handler can answer without waiting."""
+    spawn(
+        _log_event_own_session(event_type, user_id, metadata),
+        name=f"log_event:{event_type}",
+    )
@@ -0,0 +1,35 @@
+"""Fire-and-forget tasks that must not block the Telegram response."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Coroutine
+
+logger = logging.getLogger(__name__)
+
+# The event loop keeps only weak references to tasks — hold them until done
+_tasks: set[asyncio.Task] = set()
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task %s failed", task.get_name(), exc_info=task.exception())
+
+
+def spawn(coro: Coroutine[Any, Any, Any], *, name: str | None = None) -> asyncio.Task:
+    """Schedule `coro` on the running loop without awaiting it."""
+    task = asyncio.create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def drain(timeout: float) -> None:
+    """Wait up to `timeout` seconds for in-flight tasks (call on shutdown)."""
+    if not _tasks:
+        return
+    _, pending = await asyncio.wait(set(_tasks), timeout=timeout)
+    if pending:
+        logger.warning("%d background task(s) still running after %.0fs", len(pending), timeout)